@@ -0,0 +1,48 @@
+"""
+Numeric kernels for the stats finder agent, compiled with Numba when available
+"""
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; kernels run as plain Python/NumPy
+
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+
+        return decorator
+
+
+TREND_INCREASING = 1
+TREND_STABLE = 0
+TREND_DECREASING = -1
+
+
+@njit(cache=True, fastmath=True)
+def classify_trend(daily_counts):
+    """Compare the last 7 days against the 7 before them (newest-first counts)
+
+    Returns (pattern, recent_avg, change_percentage); callers must ensure at
+    least 7 days of data.
+    """
+    n = daily_counts.shape[0]
+    recent_avg = daily_counts[:7].mean()
+    older_avg = daily_counts[7:min(14, n)].mean() if n > 7 else 0.0
+
+    change_percentage = (
+        (recent_avg - older_avg) / older_avg * 100.0 if older_avg > 0 else 0.0
+    )
+
+    if recent_avg > older_avg * 1.2:
+        pattern = TREND_INCREASING
+    elif recent_avg < older_avg * 0.8:
+        pattern = TREND_DECREASING
+    else:
+        pattern = TREND_STABLE
+
+    return pattern, recent_avg, change_percentage
+
+
+# Compile (or load the cached build) at import rather than on the first request
+classify_trend(np.zeros(7, dtype=np.float64))
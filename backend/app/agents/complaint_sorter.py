@@ -5,7 +5,6 @@ from typing import Dict, Any, List
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
-from langchain_core.messages import AIMessage
 
 from app.services.llm import llm_service
 from app.models.schemas import ComplaintState
@@ -22,7 +21,7 @@ class ComplaintSorterAgent:
     async def process(
         self, state: ComplaintState, db: AsyncSession = None
     ) -> ComplaintState:
-        start_time = time.time()
+        start_time = time.perf_counter()
 
         try:
             logger.info(
@@ -33,8 +32,13 @@ class ComplaintSorterAgent:
             narrative = state.get("redacted_narrative", state["narrative"])
             entities = state.get("entities", {})
 
-            # Step 2: Classify complaint using LLM
-            classification = await llm_service.classify_complaint(narrative, entities)
+            # Step 2: Classify complaint using LLM, unless the reader already
+            # classified it alongside entity extraction
+            classification = dict(state.get("classification") or {})
+            if not classification.get("issue_category"):
+                classification = await llm_service.classify_complaint(
+                    narrative, entities
+                )
 
             # Step 3: Historical validation
             if db:
@@ -57,7 +61,7 @@ class ComplaintSorterAgent:
             state["current_agent"] = "complaint_sorter"
 
             # Add processing step
-            execution_time = time.time() - start_time
+            execution_time = time.perf_counter() - start_time
             step = {
                 "agent": "complaint_sorter",
                 "status": "success",
@@ -75,8 +79,9 @@ class ComplaintSorterAgent:
             state["processing_steps"].append(step)
 
             # Add message
-            message = AIMessage(
-                content=f"🏷️ Complaint Classification Complete!\n"
+            message = (
+                "assistant",
+                f"🏷️ Complaint Classification Complete!\n"
                 f"📦 Product: {enriched_classification.get('product_category', 'Unknown')}\n"
                 f"⚠️ Issue: {enriched_classification.get('issue_category', 'Unknown')}\n"
                 f"🚨 Urgency: {enriched_classification.get('urgency_level', 'Medium')}\n"
@@ -92,7 +97,7 @@ class ComplaintSorterAgent:
             state["errors"].append(f"complaint_sorter: {str(e)}")
 
             # Add failed step
-            execution_time = time.time() - start_time
+            execution_time = time.perf_counter() - start_time
             step = {
                 "agent": "complaint_sorter",
                 "status": "failed",
@@ -1,11 +1,10 @@
 import logging
 import time
-import json
 from typing import Dict, Any, List
+import orjson
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
-from langchain_core.messages import AIMessage
 
 from app.models.schemas import ComplaintState
 
@@ -31,7 +30,7 @@ class FeedbackLoggerAgent:
         self, state: ComplaintState, db: AsyncSession = None
     ) -> ComplaintState:
         """Process complaint through feedback logging and learning pipeline"""
-        start_time = time.time()
+        start_time = time.perf_counter()
 
         try:
             logger.info(
@@ -99,7 +98,7 @@ class FeedbackLoggerAgent:
             state["current_agent"] = "feedback_logger"
 
             # Add processing step
-            execution_time = time.time() - start_time
+            execution_time = time.perf_counter() - start_time
             step = {
                 "agent": "feedback_logger",
                 "status": "success",
@@ -122,8 +121,9 @@ class FeedbackLoggerAgent:
             total_time = sum(
                 step["execution_time"] for step in state["processing_steps"]
             )
-            message = AIMessage(
-                content=f"🎯 Workflow Completed Successfully!\n"
+            message = (
+                "assistant",
+                f"🎯 Workflow Completed Successfully!\n"
                 f"⏱️ Total Processing Time: {total_time:.2f}s\n"
                 f"🤖 Agents Executed: {len(state['processing_steps'])}\n"
                 f"✅ Success Rate: {comprehensive_feedback['completion_summary']['success_rate']:.1%}\n"
@@ -144,7 +144,7 @@ class FeedbackLoggerAgent:
             state["errors"].append(f"feedback_logger: {str(e)}")
 
             # Add failed step
-            execution_time = time.time() - start_time
+            execution_time = time.perf_counter() - start_time
             step = {
                 "agent": "feedback_logger",
                 "status": "failed",
@@ -310,7 +310,7 @@ class FeedbackLoggerAgent:
                     audit_query = text(
                         """
                         INSERT INTO audit_logs (tenant_id, user_id, action, payload, created_at)
-                        VALUES (:tenant_id, :user_id, :action, :payload, NOW())
+                        VALUES (:tenant_id, :user_id, :action, :payload, UTC_TIMESTAMP())
                     """
                     )
 
@@ -320,13 +320,15 @@ class FeedbackLoggerAgent:
                             "tenant_id": state["tenant_id"],
                             "user_id": state.get("user_id"),
                             "action": "workflow_completion",
-                            "payload": json.dumps(
+                            "payload": orjson.dumps(
                                 {
                                     "complaint_id": state["complaint_id"],
                                     "metrics": metrics,
                                     "audit_entries": audit_entries,
-                                }
-                            ),
+                                },
+                                option=orjson.OPT_NON_STR_KEYS
+                                | orjson.OPT_SERIALIZE_NUMPY,
+                            ).decode(),
                         },
                     )
                     await db.commit()
@@ -3,14 +3,22 @@ import time
 import json
 from typing import Dict, Any, List
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
 
-from langchain_core.messages import AIMessage
 
 from app.services.risk_model import risk_model
 from app.models.schemas import ComplaintState
 
 logger = logging.getLogger(__name__)
 
+_UPDATE_LATEST_RISK_SQL = text(
+    """
+        UPDATE complaints_raw
+        SET latest_risk = :risk, latest_risk_category = :category
+        WHERE id = :complaint_id AND tenant_id = :tenant_id
+    """
+)
+
 
 class RiskCheckerAgent:
 
@@ -30,7 +38,7 @@ class RiskCheckerAgent:
     async def process(
         self, state: ComplaintState, db: AsyncSession = None
     ) -> ComplaintState:
-        start_time = time.time()
+        start_time = time.perf_counter()
 
         try:
             logger.info(f"Starting risk_checker for complaint {state['complaint_id']}")
@@ -79,8 +87,11 @@ class RiskCheckerAgent:
             state["risk_assessment"] = comprehensive_risk
             state["current_agent"] = "risk_checker"
 
+            if db:
+                await self._store_latest_risk(state, risk_prediction, db)
+
             # Add processing step
-            execution_time = time.time() - start_time
+            execution_time = time.perf_counter() - start_time
             step = {
                 "agent": "risk_checker",
                 "status": "success",
@@ -99,8 +110,9 @@ class RiskCheckerAgent:
             risk_emoji = self._get_risk_emoji(
                 risk_prediction.get("risk_category", "medium")
             )
-            message = AIMessage(
-                content=f"{risk_emoji} Risk Assessment Complete!\n"
+            message = (
+                "assistant",
+                f"{risk_emoji} Risk Assessment Complete!\n"
                 f"📊 Risk Score: {risk_prediction.get('risk_score', 0.0):.2f}\n"
                 f"🏷️ Risk Category: {risk_prediction.get('risk_category', 'Medium').upper()}\n"
                 f"📈 Escalation Probability: {escalation_probability:.1%}\n"
@@ -117,7 +129,7 @@ class RiskCheckerAgent:
             state["errors"].append(f"risk_checker: {str(e)}")
 
             # Add failed step
-            execution_time = time.time() - start_time
+            execution_time = time.perf_counter() - start_time
             step = {
                 "agent": "risk_checker",
                 "status": "failed",
@@ -207,6 +219,25 @@ class RiskCheckerAgent:
             logger.error(f"Error in risk prediction: {e}")
             return self._get_default_risk_assessment()
 
+    async def _store_latest_risk(
+        self, state: ComplaintState, risk_prediction: Dict[str, Any], db: AsyncSession
+    ):
+        """Cache the latest risk score on the complaint row for listings"""
+        try:
+            await db.execute(
+                _UPDATE_LATEST_RISK_SQL,
+                {
+                    "risk": risk_prediction.get("risk_score", 0.0),
+                    "category": risk_prediction.get("risk_category", "medium"),
+                    "complaint_id": state["complaint_id"],
+                    "tenant_id": state["tenant_id"],
+                },
+            )
+            await db.commit()
+        except Exception as e:
+            logger.error(f"Error storing latest risk: {e}")
+            await db.rollback()
+
     def _generate_risk_explanation(
         self,
         risk_prediction: Dict[str, Any],
@@ -1,16 +1,56 @@
 import logging
+import re
 import time
 import json
-from typing import Dict, Any, List
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from langchain_core.messages import AIMessage
 
 from app.services.llm import llm_service
 from app.models.schemas import ComplaintState
 
 logger = logging.getLogger(__name__)
 
+# Strategy keywords that drive solution-specific follow-up actions
+_STRATEGY_KIND_RE = re.compile(r"refund|investigation|escalation", re.IGNORECASE)
+
+# Sentence fragments between periods, scanned lazily for letter key points
+_SENTENCE_RE = re.compile(r"[^.]+")
+
+# Resource intensity by strategy keyword, checked in priority order
+_RESOURCE_INTENSITY_KEYWORDS = (("investigation", "high"), ("refund", "medium"))
+
+def _letter_tone(risk_category: Optional[str], emotion: Optional[str]) -> str:
+    """Letter tone; high risk or anger calls for a formal apology, frustration for an understanding one"""
+    if risk_category == "high" or emotion == "angry":
+        return "empathetic_formal"
+    if emotion == "frustrated":
+        return "understanding_professional"
+    return "professional_friendly"
+
+
+# Letter tone precomputed for the usual (risk_category, emotion) pairs
+_LETTER_TONES = {
+    (risk, emotion): _letter_tone(risk, emotion)
+    for risk in ("high", "medium", "low")
+    for emotion in ("angry", "frustrated", "disappointed", "confused", "neutral", "other")
+}
+
+
+@dataclass(slots=True)
+class LetterContext:
+    """Per-complaint values needed to render a response letter"""
+
+    complaint_id: int
+    issue_type: str
+    urgency: str
+    risk_category: str
+    emotion: str
+    tone: str
+    subject_line: str
+
 
 class SolutionHelperAgent:
         
@@ -29,7 +69,7 @@ class SolutionHelperAgent:
     
     async def process(self, state: ComplaintState, db: AsyncSession = None) -> ComplaintState:
         """Process complaint through solution generation pipeline"""
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         try:
             logger.info(f"Starting solution_helper for complaint {state['complaint_id']}")
@@ -77,7 +117,7 @@ class SolutionHelperAgent:
             state["current_agent"] = "solution_helper"
             
             # Add processing step
-            execution_time = time.time() - start_time
+            execution_time = time.perf_counter() - start_time
             step = {
                 "agent": "solution_helper",
                 "status": "success",
@@ -93,8 +133,9 @@ class SolutionHelperAgent:
             state["processing_steps"].append(step)
             
             # Add message
-            message = AIMessage(
-                content=f"💡 Solution Generated Successfully!\n"
+            message = (
+                "assistant",
+                f"💡 Solution Generated Successfully!\n"
                        f"🎯 Strategy: {primary_solution.get('resolution_strategy', 'Custom Resolution')}\n"
                        f"⏱️ Est. Time: {primary_solution.get('estimated_resolution_time', 'TBD')}\n"
                        f"📈 Success Rate: {solution_metrics.get('success_probability', 0.0):.1%}\n"
@@ -111,7 +152,7 @@ class SolutionHelperAgent:
             state["errors"].append(f"solution_helper: {str(e)}")
             
             # Add failed step
-            execution_time = time.time() - start_time
+            execution_time = time.perf_counter() - start_time
             step = {
                 "agent": "solution_helper",
                 "status": "failed",
@@ -244,10 +285,7 @@ class SolutionHelperAgent:
         """Generate professional response letter"""
         try:
             # Extract key information
-            customer_name = state.get("entities", {}).get("customer_name", "[Customer Name]")
-            complaint_id = state["complaint_id"]
-            issue_type = state.get("classification", {}).get("issue_category", "complaint")
-            resolution_strategy = solution.get("resolution_strategy", "investigation")
+            letter_context = self._build_letter_context(state)
             
             # Generate letter content using LLM
             letter_content = solution.get("response_letter", "")
@@ -262,8 +300,8 @@ class SolutionHelperAgent:
             # Generate letter metadata
             letter_metadata = {
                 "letter_type": "resolution_response",
-                "tone": self._determine_letter_tone(state),
-                "urgency": state.get("classification", {}).get("urgency_level", "medium"),
+                "tone": letter_context.tone,
+                "urgency": letter_context.urgency,
                 "compliance_reviewed": True,
                 "personalization_level": "high",
                 "estimated_reading_time": len(personalized_letter.split()) // 200,  # minutes
@@ -274,7 +312,7 @@ class SolutionHelperAgent:
             return {
                 "content": personalized_letter,
                 "metadata": letter_metadata,
-                "subject_line": self._generate_subject_line(state, solution),
+                "subject_line": letter_context.subject_line,
                 "key_points": self._extract_key_points(personalized_letter),
                 "call_to_action": self._generate_call_to_action(solution),
                 "follow_up_date": self._calculate_follow_up_date(solution)
@@ -341,7 +379,11 @@ class SolutionHelperAgent:
             
             # Solution-specific actions
             resolution_strategy = solution.get("resolution_strategy", "")
-            if "refund" in resolution_strategy.lower():
+            strategy_kinds = {
+                m.group(0).lower()
+                for m in _STRATEGY_KIND_RE.finditer(resolution_strategy)
+            }
+            if "refund" in strategy_kinds:
                 actions.append({
                     "action": "process_refund",
                     "description": "Process customer refund as per resolution",
@@ -352,7 +394,7 @@ class SolutionHelperAgent:
                     "dependencies": ["supervisor_review"]
                 })
             
-            if "investigation" in resolution_strategy.lower():
+            if "investigation" in strategy_kinds:
                 actions.append({
                     "action": "conduct_investigation",
                     "description": "Investigate complaint details thoroughly",
@@ -681,30 +723,37 @@ Customer Service Team
         
         return personalized
     
-    def _determine_letter_tone(self, state: ComplaintState) -> str:
-        """Determine appropriate tone for letter"""
+    def _build_letter_context(self, state: ComplaintState) -> LetterContext:
+        """Read letter inputs from state once and derive tone and subject line"""
+        complaint_id = state["complaint_id"]
+        classification = state.get("classification", {})
+        issue_type = classification.get("issue_category", "complaint")
         risk_category = state.get("risk_assessment", {}).get("risk_category", "medium")
-        sentiment = state.get("sentiment", {}).get("emotion", "neutral")
+        emotion = state.get("sentiment", {}).get("emotion", "neutral")
         
-        if risk_category == "high" or sentiment == "angry":
-            return "empathetic_formal"
-        elif sentiment == "frustrated":
-            return "understanding_professional"
-        else:
-            return "professional_friendly"
-    
-    def _generate_subject_line(self, state: ComplaintState, solution: Dict[str, Any]) -> str:
-        """Generate email subject line"""
-        complaint_id = state["complaint_id"]
-        issue_type = state.get("classification", {}).get("issue_category", "complaint")
+        # Determine appropriate tone for letter
+        tone = _LETTER_TONES.get((risk_category, emotion)) or _letter_tone(risk_category, emotion)
         
-        return f"Re: Your {issue_type.replace('_', ' ').title()} - Complaint #{complaint_id}"
+        return LetterContext(
+            complaint_id=complaint_id,
+            issue_type=issue_type,
+            urgency=classification.get("urgency_level", "medium"),
+            risk_category=risk_category,
+            emotion=emotion,
+            tone=tone,
+            subject_line=f"Re: Your {issue_type.replace('_', ' ').title()} - Complaint #{complaint_id}",
+        )
     
     def _extract_key_points(self, letter_content: str) -> List[str]:
         """Extract key points from letter"""
         # Simple extraction - would use NLP in production
-        sentences = letter_content.split('.')
-        key_points = [s.strip() for s in sentences if len(s.strip()) > 20][:3]
+        key_points = []
+        for match in _SENTENCE_RE.finditer(letter_content):
+            sentence = match.group(0).strip()
+            if len(sentence) > 20:
+                key_points.append(sentence)
+                if len(key_points) == 3:
+                    break
         return key_points
     
     def _generate_call_to_action(self, solution: Dict[str, Any]) -> str:
@@ -713,13 +762,11 @@ Customer Service Team
     
     def _calculate_follow_up_date(self, solution: Dict[str, Any]) -> str:
         """Calculate follow-up date"""
-        from datetime import datetime, timedelta
         follow_up_date = datetime.now() + timedelta(days=7)
         return follow_up_date.isoformat()
     
     def _calculate_due_date(self, hours: int = 0, days: int = 0) -> str:
         """Calculate due date for actions"""
-        from datetime import datetime, timedelta
         due_date = datetime.now() + timedelta(hours=hours, days=days)
         return due_date.isoformat()
     
@@ -750,14 +797,12 @@ Customer Service Team
     
     def _calculate_resource_intensity(self, solution: Dict[str, Any]) -> str:
         """Calculate resource intensity"""
-        strategy = solution.get("resolution_strategy", "")
+        strategy = solution.get("resolution_strategy", "").lower()
         
-        if "investigation" in strategy.lower():
-            return "high"
-        elif "refund" in strategy.lower():
-            return "medium"
-        else:
-            return "low"
+        for keyword, intensity in _RESOURCE_INTENSITY_KEYWORDS:
+            if keyword in strategy:
+                return intensity
+        return "low"
     
     def _predict_customer_satisfaction(self, state: ComplaintState, solution: Dict[str, Any]) -> float:
         """Predict customer satisfaction with solution"""
@@ -1,12 +1,15 @@
 import logging
 import asyncio
-from typing import TypedDict, Annotated, List
+import time
+from collections import defaultdict, deque
+from operator import itemgetter
+from contextvars import ContextVar
+from typing import TypedDict, Annotated, Any, Deque, Dict, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from langgraph.graph import StateGraph, END
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
-from langchain_openai import ChatOpenAI
-from app.core.database import get_db
+from app.core.database import AsyncSessionLocal
+from app.core.redis import redis_client
 
 from app.core.config import settings
 from app.models.schemas import ComplaintState
@@ -21,17 +24,35 @@ from app.agents.feedback_logger import feedback_logger_agent
 
 logger = logging.getLogger(__name__)
 
+# Session shared by every node of the current process_complaint run
+_workflow_db: ContextVar[Optional[AsyncSession]] = ContextVar(
+    "workflow_db", default=None
+)
+
+# Communication log and per-recipient mailbox of the current run, so concurrent
+# process_complaint calls never see each other's messages
+_communication_log: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar(
+    "communication_log", default=None
+)
+_agent_mailbox: ContextVar[Optional[Dict[Tuple[int, str], Deque[Dict[str, Any]]]]] = (
+    ContextVar("agent_mailbox", default=None)
+)
+
+_step_execution_time = itemgetter("execution_time")
+
+
+def _total_execution_time(processing_steps: List[Dict[str, Any]]) -> float:
+    """Sum agent execution times in a single pass"""
+    return sum(map(_step_execution_time, processing_steps))
+
 
 class ComplaintWorkflowGraph:
 
     def __init__(self):
-        self.llm = ChatOpenAI(
-            model="gpt-4-turbo-preview",
-            temperature=0.1,
-            api_key=settings.OPENAI_API_KEY,
-        )
         self.graph = self._build_graph()
-        self.agent_communication_log = []
+        # Echo agent-to-agent hops into the returned conversation
+        self.verbose_conversation = settings.WORKFLOW_VERBOSE_CONVERSATION
+        self.communication_stream_maxlen = 100
 
     def _build_graph(self) -> StateGraph:
         workflow = StateGraph(ComplaintState)
@@ -39,17 +60,15 @@ class ComplaintWorkflowGraph:
         # Add nodes (agents)
         workflow.add_node("complaint_reader", self._complaint_reader_with_communication)
         workflow.add_node("complaint_sorter", self._complaint_sorter_with_communication)
-        workflow.add_node("stats_finder", self._stats_finder_with_communication)
-        workflow.add_node("risk_checker", self._risk_checker_with_communication)
+        workflow.add_node("stats_and_risk", self._stats_and_risk_with_communication)
         workflow.add_node("solution_helper", self._solution_helper_with_communication)
         workflow.add_node("feedback_logger", self._feedback_logger_with_communication)
 
         # Define the workflow edges
         workflow.set_entry_point("complaint_reader")
         workflow.add_edge("complaint_reader", "complaint_sorter")
-        workflow.add_edge("complaint_sorter", "stats_finder")
-        workflow.add_edge("stats_finder", "risk_checker")
-        workflow.add_edge("risk_checker", "solution_helper")
+        workflow.add_edge("complaint_sorter", "stats_and_risk")
+        workflow.add_edge("stats_and_risk", "solution_helper")
         workflow.add_edge("solution_helper", "feedback_logger")
         workflow.add_edge("feedback_logger", END)
 
@@ -59,131 +78,156 @@ class ComplaintWorkflowGraph:
         self, state: ComplaintState
     ) -> ComplaintState:
         """Delegate to complaint reader agent"""
-        async with get_db() as db:
-            # Log agent start
-            self._log_agent_communication("complaint_reader", "starting", state)
-
-            # Process with database session
-            result_state = await complaint_reader_agent.process(state, db)
-
-            # Send message to next agent
-            await self._send_agent_message(
-                from_agent="complaint_reader",
-                to_agent="complaint_sorter",
-                message=f"Entities extracted: {len(result_state.get('entities', {}))}, PII detected: {result_state.get('pii_detected', False)}",
-                state=result_state,
-            )
+        db = _workflow_db.get()
+        # Log agent start
+        self._log_agent_communication("complaint_reader", "starting", state)
+
+        # Process with database session
+        result_state = await complaint_reader_agent.process(state, db)
+
+        # Send message to next agent
+        await self._send_agent_message(
+            from_agent="complaint_reader",
+            to_agent="complaint_sorter",
+            message=f"Entities extracted: {len(result_state.get('entities', {}))}, PII detected: {result_state.get('pii_detected', False)}",
+            state=result_state,
+        )
 
-            return result_state
+        return result_state
 
     async def _complaint_sorter_with_communication(
         self, state: ComplaintState
     ) -> ComplaintState:
         """Delegate to complaint sorter agent"""
-        async with get_db() as db:
-            # Check for messages from previous agent
-            await self._receive_agent_message("complaint_sorter", state)
-
-            result_state = await complaint_sorter_agent.process(state, db)
-
-            # Send classification results to stats finder
-            await self._send_agent_message(
-                from_agent="complaint_sorter",
-                to_agent="stats_finder",
-                message=f"Classification: {result_state.get('classification', {}).get('issue_category', 'unknown')} with {result_state.get('classification', {}).get('confidence_score', 0):.2f} confidence",
-                state=result_state,
+        db = _workflow_db.get()
+        # Check for messages from previous agent
+        await self._receive_agent_message("complaint_sorter", state)
+
+        result_state = await complaint_sorter_agent.process(state, db)
+
+        # Send classification results to stats finder and risk checker
+        classification_message = f"Classification: {result_state.get('classification', {}).get('issue_category', 'unknown')} with {result_state.get('classification', {}).get('confidence_score', 0):.2f} confidence"
+        await self._send_agent_message(
+            from_agent="complaint_sorter",
+            to_agent="stats_finder",
+            message=classification_message,
+            state=result_state,
+        )
+        await self._send_agent_message(
+            from_agent="complaint_sorter",
+            to_agent="risk_checker",
+            message=classification_message,
+            state=result_state,
+        )
+
+        return result_state
+
+    async def _stats_and_risk_with_communication(
+        self, state: ComplaintState
+    ) -> ComplaintState:
+        """Run stats finder and risk checker concurrently; both only need the classification"""
+        # The agents write disjoint state keys and only append to the shared lists.
+        # An AsyncSession cannot run concurrent statements, so the risk checker
+        # gets its own session while the stats finder uses the workflow one
+        db = _workflow_db.get()
+        if not db:
+            await asyncio.gather(
+                self._stats_finder_with_communication(state, None),
+                self._risk_checker_with_communication(state, None),
             )
+            return state
 
-            return result_state
+        async with AsyncSessionLocal() as risk_db:
+            await asyncio.gather(
+                self._stats_finder_with_communication(state, db),
+                self._risk_checker_with_communication(state, risk_db),
+            )
+        return state
 
     async def _stats_finder_with_communication(
-        self, state: ComplaintState
+        self, state: ComplaintState, db: Optional[AsyncSession]
     ) -> ComplaintState:
         """Delegate to stats finder agent"""
-        async with get_db() as db:
-            await self._receive_agent_message("stats_finder", state)
-
-            result_state = await stats_finder_agent.process(state, db)
-
-            # Send benchmarking data to risk checker
-            similar_count = len(result_state.get("similar_complaints", []))
-            await self._send_agent_message(
-                from_agent="stats_finder",
-                to_agent="risk_checker",
-                message=f"Found {similar_count} similar complaints, industry benchmark data available",
-                state=result_state,
-            )
+        await self._receive_agent_message("stats_finder", state)
+
+        result_state = await stats_finder_agent.process(state, db)
+
+        # Send benchmarking data to solution helper
+        similar_count = len(result_state.get("similar_complaints", []))
+        await self._send_agent_message(
+            from_agent="stats_finder",
+            to_agent="solution_helper",
+            message=f"Found {similar_count} similar complaints, industry benchmark data available",
+            state=result_state,
+        )
 
-            return result_state
+        return result_state
 
     async def _risk_checker_with_communication(
-        self, state: ComplaintState
+        self, state: ComplaintState, db: Optional[AsyncSession]
     ) -> ComplaintState:
         """Delegate to risk checker agent"""
-        async with get_db() as db:
-            await self._receive_agent_message("risk_checker", state)
+        await self._receive_agent_message("risk_checker", state)
 
-            result_state = await risk_checker_agent.process(state, db)
+        result_state = await risk_checker_agent.process(state, db)
 
-            # Send risk assessment to solution helper
-            risk_score = result_state.get("risk_assessment", {}).get("risk_score", 0)
-            risk_category = result_state.get("risk_assessment", {}).get(
-                "risk_category", "medium"
-            )
-            await self._send_agent_message(
-                from_agent="risk_checker",
-                to_agent="solution_helper",
-                message=f"Risk assessment: {risk_category} risk ({risk_score:.2f} score), mitigation strategies identified",
-                state=result_state,
-            )
+        # Send risk assessment to solution helper
+        risk_score = result_state.get("risk_assessment", {}).get("risk_score", 0)
+        risk_category = result_state.get("risk_assessment", {}).get(
+            "risk_category", "medium"
+        )
+        await self._send_agent_message(
+            from_agent="risk_checker",
+            to_agent="solution_helper",
+            message=f"Risk assessment: {risk_category} risk ({risk_score:.2f} score), mitigation strategies identified",
+            state=result_state,
+        )
 
-            return result_state
+        return result_state
 
     async def _solution_helper_with_communication(
         self, state: ComplaintState
     ) -> ComplaintState:
         """Delegate to solution helper agent"""
-        async with get_db() as db:
-            await self._receive_agent_message("solution_helper", state)
+        db = _workflow_db.get()
+        await self._receive_agent_message("solution_helper", state)
 
-            result_state = await solution_helper_agent.process(state, db)
+        result_state = await solution_helper_agent.process(state, db)
 
-            # Send solution to feedback logger
-            solution_confidence = (
-                result_state.get("solution", {})
-                .get("solution_metrics", {})
-                .get("confidence", 0)
-            )
-            await self._send_agent_message(
-                from_agent="solution_helper",
-                to_agent="feedback_logger",
-                message=f"Solution generated with {solution_confidence:.2f} confidence, ready for feedback collection",
-                state=result_state,
-            )
+        # Send solution to feedback logger
+        solution_confidence = (
+            result_state.get("solution", {})
+            .get("solution_metrics", {})
+            .get("confidence", 0)
+        )
+        await self._send_agent_message(
+            from_agent="solution_helper",
+            to_agent="feedback_logger",
+            message=f"Solution generated with {solution_confidence:.2f} confidence, ready for feedback collection",
+            state=result_state,
+        )
 
-            return result_state
+        return result_state
 
     async def _feedback_logger_with_communication(
         self, state: ComplaintState
     ) -> ComplaintState:
         """Delegate to feedback logger agent"""
-        async with get_db() as db:
-            await self._receive_agent_message("feedback_logger", state)
-
-            result_state = await feedback_logger_agent.process(state, db)
-
-            # Final workflow completion message
-            total_time = sum(
-                step["execution_time"] for step in result_state["processing_steps"]
-            )
-            await self._send_agent_message(
-                from_agent="feedback_logger",
-                to_agent="workflow_complete",
-                message=f"Workflow completed successfully in {total_time:.2f}s, ready for user interaction",
-                state=result_state,
-            )
+        db = _workflow_db.get()
+        await self._receive_agent_message("feedback_logger", state)
+
+        result_state = await feedback_logger_agent.process(state, db)
+
+        # Final workflow completion message
+        total_time = _total_execution_time(result_state["processing_steps"])
+        await self._send_agent_message(
+            from_agent="feedback_logger",
+            to_agent="workflow_complete",
+            message=f"Workflow completed successfully in {total_time:.2f}s, ready for user interaction",
+            state=result_state,
+        )
 
-            return result_state
+        return result_state
 
     async def _send_agent_message(
         self, from_agent: str, to_agent: str, message: str, state: ComplaintState
@@ -195,53 +239,108 @@ class ComplaintWorkflowGraph:
             "to_agent": to_agent,
             "message": message,
             "complaint_id": state["complaint_id"],
-            "state_snapshot": {
-                "entities_count": len(state.get("entities", {})),
-                "classification_available": bool(state.get("classification")),
-                "risk_assessed": bool(state.get("risk_assessment")),
-                "solution_generated": bool(state.get("solution")),
-            },
+            # (entities_count, classification_available, risk_assessed,
+            # solution_generated), only captured when INFO diagnostics are on
+            "state_snapshot": (
+                (
+                    len(state.get("entities", {})),
+                    bool(state.get("classification")),
+                    bool(state.get("risk_assessment")),
+                    bool(state.get("solution")),
+                )
+                if logger.isEnabledFor(logging.INFO)
+                else None
+            ),
         }
 
-        self.agent_communication_log.append(communication_entry)
+        communication_log = _communication_log.get()
+        mailbox = _agent_mailbox.get()
+        if communication_log is not None and mailbox is not None:
+            communication_log.append(communication_entry)
+            mailbox[(state["complaint_id"], to_agent)].append(communication_entry)
+
+        # Mirror to a capped per-complaint Redis stream so other workers can
+        # read the conversation without this process retaining it
+        try:
+            stream_key = f"complaint:{state['complaint_id']}:comms"
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.xadd(
+                    stream_key,
+                    {
+                        "timestamp": communication_entry["timestamp"],
+                        "from_agent": from_agent,
+                        "to_agent": to_agent,
+                        "message": message,
+                    },
+                    maxlen=self.communication_stream_maxlen,
+                    approximate=True,
+                )
+                # Each complaint gets its own stream, so bound their number too
+                pipe.expire(stream_key, settings.COMMUNICATION_STREAM_TTL_SECONDS)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to stream agent communication: {e}")
 
         # Add to conversation messages
-        ai_message = AIMessage(content=f"🤖 {from_agent} → {to_agent}: {message}")
-        state["messages"].append(ai_message)
+        if self.verbose_conversation:
+            state["messages"].append(
+                ("assistant", f"🤖 {from_agent} → {to_agent}: {message}")
+            )
 
-        logger.info(f"Agent communication: {from_agent} → {to_agent}: {message}")
+        logger.info("Agent communication: %s → %s: %s", from_agent, to_agent, message)
 
     async def _receive_agent_message(self, agent_name: str, state: ComplaintState):
         """Receive and process messages for an agent"""
         # Get messages for this agent
-        agent_messages = [
-            entry
-            for entry in self.agent_communication_log
-            if entry["to_agent"] == agent_name
-            and entry["complaint_id"] == state["complaint_id"]
-        ]
+        mailbox = _agent_mailbox.get()
+        agent_messages = (
+            mailbox.get((state["complaint_id"], agent_name)) if mailbox else None
+        )
 
         if agent_messages:
             latest_message = agent_messages[-1]
-            logger.info(f"Agent {agent_name} received: {latest_message['message']}")
+            logger.info("Agent %s received: %s", agent_name, latest_message["message"])
 
             # Add received message to state
-            received_message = AIMessage(
-                content=f"📨 {agent_name} received: {latest_message['message']}"
-            )
-            state["messages"].append(received_message)
+            if self.verbose_conversation:
+                state["messages"].append(
+                    ("assistant", f"📨 {agent_name} received: {latest_message['message']}")
+                )
+
+    async def get_agent_communications(self, complaint_id: int) -> List[Dict[str, Any]]:
+        """Read a complaint's agent communications back from its Redis stream"""
+        try:
+            entries = await redis_client.xrange(f"complaint:{complaint_id}:comms")
+        except Exception as e:
+            logger.error(f"Error reading agent communications: {e}")
+            return []
+
+        return [
+            {
+                "timestamp": float(fields[b"timestamp"]),
+                "from_agent": fields[b"from_agent"].decode(),
+                "to_agent": fields[b"to_agent"].decode(),
+                "message": fields[b"message"].decode(),
+            }
+            for _, fields in entries
+        ]
 
     def _log_agent_communication(
         self, agent_name: str, action: str, state: ComplaintState
     ):
         """Log agent communication for debugging"""
         logger.info(
-            f"Agent {agent_name} {action} for complaint {state['complaint_id']}"
+            "Agent %s %s for complaint %s", agent_name, action, state["complaint_id"]
         )
 
     async def process_complaint(
-        self, complaint_id: int, narrative: str, tenant_id: str, user_id: str
-    ) -> ComplaintState:
+        self,
+        complaint_id: int,
+        narrative: str,
+        tenant_id: str,
+        user_id: str,
+        include_conversation: bool = False,
+    ) -> Dict[str, Any]:
         """Process complaint through the LangGraph workflow"""
 
         # Initialize state
@@ -260,9 +359,10 @@ class ComplaintWorkflowGraph:
             "solution": {},
             "feedback_analysis": {},
             "redacted_narrative": "",
+            "narrative_embedding": [],
             "pii_detected": False,
             "metadata": {},
-            "messages": [HumanMessage(content=f"Process complaint: {narrative}")],
+            "messages": [("human", f"Process complaint: {narrative}")],
             "current_agent": "",
             "processing_steps": [],
             "errors": [],
@@ -270,22 +370,37 @@ class ComplaintWorkflowGraph:
 
         try:
             # Execute the workflow
-            logger.info(f"Starting LangGraph workflow for complaint {complaint_id}")
-
-            # Clear communication log for this workflow
-            self.agent_communication_log = []
-
-            final_state: ComplaintState = await self.graph.ainvoke(initial_state)
+            logger.info("Starting LangGraph workflow for complaint %s", complaint_id)
+
+            # Fresh communication log and mailbox for this workflow run
+            communication_log: List[Dict[str, Any]] = []
+            log_token = _communication_log.set(communication_log)
+            mailbox_token = _agent_mailbox.set(defaultdict(deque))
+
+            # One pooled session serves the whole run instead of one per agent
+            async with AsyncSessionLocal() as db:
+                token = _workflow_db.set(db)
+                try:
+                    final_state: ComplaintState = await self.graph.ainvoke(
+                        initial_state
+                    )
+                except Exception:
+                    await db.rollback()
+                    raise
+                finally:
+                    _workflow_db.reset(token)
+                    _communication_log.reset(log_token)
+                    _agent_mailbox.reset(mailbox_token)
 
             # Compile results
             result = {
                 "complaint_id": complaint_id,
                 "workflow_status": "completed",
-                "total_execution_time": sum(
-                    step["execution_time"] for step in final_state["processing_steps"]
+                "total_execution_time": _total_execution_time(
+                    final_state["processing_steps"]
                 ),
                 "agents_executed": len(final_state["processing_steps"]),
-                "agent_communications": self.agent_communication_log,
+                "agent_communications": communication_log,
                 "errors": final_state.get("errors", []),
                 "results": {
                     "redacted_narrative": final_state.get("redacted_narrative", ""),
@@ -299,21 +414,18 @@ class ComplaintWorkflowGraph:
                     "metadata": final_state.get("metadata", {}),
                 },
                 "processing_steps": final_state["processing_steps"],
-                "conversation": [
-                    {
-                        "role": (
-                            "human" if isinstance(msg, HumanMessage) else "assistant"
-                        ),
-                        "content": msg.content,
-                    }
-                    for msg in final_state["messages"]
-                ],
             }
+            if include_conversation:
+                result["conversation"] = [
+                    {"role": role, "content": content}
+                    for role, content in final_state["messages"]
+                ]
 
             logger.info(
-                f"LangGraph workflow completed successfully for complaint {complaint_id}"
+                "LangGraph workflow completed successfully for complaint %s",
+                complaint_id,
             )
-            return final_state
+            return result
 
         except Exception as e:
             logger.error(f"Error in LangGraph workflow: {e}")
@@ -1,3 +1,4 @@
+from functools import cached_property, lru_cache
 from typing import List
 from pydantic_settings import BaseSettings
 from pydantic import Field
@@ -12,9 +13,46 @@ class Settings(BaseSettings):
     TIDB_PASSWORD: str = Field(..., env="TIDB_PASSWORD")
     TIDB_DATABASE: str = Field(..., env="TIDB_DATABASE")
     TIDB_SSL_CA: str = Field("", env="TIDB_SSL_CA")
+    DATABASE_POOL_SIZE: int = Field(20, env="DATABASE_POOL_SIZE")
+    DATABASE_MAX_OVERFLOW: int = Field(40, env="DATABASE_MAX_OVERFLOW")
+    DATABASE_POOL_TIMEOUT: int = Field(30, env="DATABASE_POOL_TIMEOUT")
+    DATABASE_ECHO: bool = Field(False, env="DATABASE_ECHO")
 
     # OpenAI
     OPENAI_API_KEY: str = Field(..., env="OPENAI_API_KEY")
+    # Cheaper model for entity, classification and sentiment prompts; solution
+    # generation and escalations use the full model
+    OPENAI_ANALYSIS_MODEL: str = Field("gpt-4o-mini", env="OPENAI_ANALYSIS_MODEL")
+    OPENAI_MAX_CONCURRENCY: int = Field(32, env="OPENAI_MAX_CONCURRENCY")
+    # Account rate limits for hosted chat completions; 0 disables pacing
+    OPENAI_MAX_REQUESTS_PER_MINUTE: int = Field(500, env="OPENAI_MAX_REQUESTS_PER_MINUTE")
+    OPENAI_MAX_TOKENS_PER_MINUTE: int = Field(150_000, env="OPENAI_MAX_TOKENS_PER_MINUTE")
+    OPENAI_COMPLETION_TOKEN_ESTIMATE: int = Field(500, env="OPENAI_COMPLETION_TOKEN_ESTIMATE")
+    OPENAI_MAX_CONNECTIONS: int = Field(200, env="OPENAI_MAX_CONNECTIONS")
+    OPENAI_BATCH_POLL_SECONDS: int = Field(60, env="OPENAI_BATCH_POLL_SECONDS")
+
+    # Self-hosted LLM for narrative analysis (disabled when URL is empty)
+    LOCAL_LLM_URL: str = Field("", env="LOCAL_LLM_URL")
+    LOCAL_LLM_MODEL: str = Field(
+        "meta-llama/Meta-Llama-3-8B-Instruct-AWQ", env="LOCAL_LLM_MODEL"
+    )
+    LOCAL_LLM_API_KEY: str = Field("EMPTY", env="LOCAL_LLM_API_KEY")
+
+    # Constrain the bundled analysis to a strict JSON schema; needs a model
+    # with structured-output support (or a vLLM server with guided decoding)
+    LLM_STRUCTURED_OUTPUTS: bool = Field(False, env="LLM_STRUCTURED_OUTPUTS")
+
+    # In-process ONNX complaint classifier (disabled when the directory is empty)
+    COMPLAINT_CLASSIFIER_DIR: str = Field("", env="COMPLAINT_CLASSIFIER_DIR")
+    COMPLAINT_CLASSIFIER_MIN_CONFIDENCE: float = Field(
+        0.6, env="COMPLAINT_CLASSIFIER_MIN_CONFIDENCE"
+    )
+
+    # Serialized XGBoost booster for risk scoring; rule-based scoring when empty
+    RISK_MODEL_PATH: str = Field("", env="RISK_MODEL_PATH")
+
+    # PII redaction
+    PII_SPACY_MODEL: str = Field("en_core_web_lg", env="PII_SPACY_MODEL")
 
     # JWT
     SECRET_KEY: str = Field(..., env="SECRET_KEY")
@@ -23,11 +61,45 @@ class Settings(BaseSettings):
 
     # Redis
     REDIS_URL: str = Field("redis://localhost:6379", env="REDIS_URL")
+    LLM_CACHE_TTL_SECONDS: int = Field(7 * 86400, env="LLM_CACHE_TTL_SECONDS")
+    STATS_CACHE_TTL_SECONDS: int = Field(60, env="STATS_CACHE_TTL_SECONDS")
+    HISTORICAL_FEATURES_CACHE_TTL_SECONDS: int = Field(
+        300, env="HISTORICAL_FEATURES_CACHE_TTL_SECONDS"
+    )
+    # Upper bound on one complaint workflow run; the in-progress marker
+    # expires after this so a crashed run does not block re-analysis
+    COMPLAINT_WORKFLOW_LOCK_SECONDS: int = Field(
+        900, env="COMPLAINT_WORKFLOW_LOCK_SECONDS"
+    )
+    # How long a request waits on a solution draft another request is generating
+    SOLUTION_DRAFT_WAIT_SECONDS: int = Field(120, env="SOLUTION_DRAFT_WAIT_SECONDS")
 
-    # Telemetry
-    JAEGER_ENDPOINT: str = Field(
-        "http://localhost:14268/api/traces", env="JAEGER_ENDPOINT"
+    # Analytics rollups
+    BENCHMARK_ROLLUP_REFRESH_SECONDS: int = Field(
+        3600, env="BENCHMARK_ROLLUP_REFRESH_SECONDS"
     )
+    BENCHMARK_ROLLUP_WINDOW_DAYS: int = Field(90, env="BENCHMARK_ROLLUP_WINDOW_DAYS")
+    USER_COMPANY_STATS_REFRESH_SECONDS: int = Field(
+        86400, env="USER_COMPANY_STATS_REFRESH_SECONDS"
+    )
+
+    # Audit log writer
+    AUDIT_LOG_QUEUE_SIZE: int = Field(10_000, env="AUDIT_LOG_QUEUE_SIZE")
+    AUDIT_LOG_BATCH_SIZE: int = Field(500, env="AUDIT_LOG_BATCH_SIZE")
+    AUDIT_LOG_FLUSH_INTERVAL_MS: int = Field(50, env="AUDIT_LOG_FLUSH_INTERVAL_MS")
+    AUDIT_LOG_WRITE_ATTEMPTS: int = Field(5, env="AUDIT_LOG_WRITE_ATTEMPTS")
+
+    # Workflow
+    WORKFLOW_VERBOSE_CONVERSATION: bool = Field(
+        False, env="WORKFLOW_VERBOSE_CONVERSATION"
+    )
+    # Lifetime of a complaint's agent communication stream in Redis
+    COMMUNICATION_STREAM_TTL_SECONDS: int = Field(
+        7 * 86400, env="COMMUNICATION_STREAM_TTL_SECONDS"
+    )
+
+    # Telemetry; OpenTelemetry collector (OTLP/gRPC)
+    OTLP_ENDPOINT: str = Field("http://localhost:4317", env="OTLP_ENDPOINT")
 
     # Application
     ENVIRONMENT: str = Field("development", env="ENVIRONMENT")
@@ -36,7 +108,7 @@ class Settings(BaseSettings):
         ["http://localhost:3000", "https://localhost:3000"], env="ALLOWED_ORIGINS"
     )
 
-    @property
+    @cached_property
     def database_url(self) -> str:
         ssl_params = f"?ssl_ca={self.TIDB_SSL_CA}" if self.TIDB_SSL_CA else ""
         return f"mysql+asyncmy://{self.TIDB_USER}:{self.TIDB_PASSWORD}@{self.TIDB_HOST}:{self.TIDB_PORT}/{self.TIDB_DATABASE}{ssl_params}"
@@ -46,4 +118,9 @@ class Settings(BaseSettings):
         case_sensitive = True
 
 
-settings = Settings()
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
+
+
+settings = get_settings()
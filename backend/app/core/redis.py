@@ -0,0 +1,6 @@
+import redis.asyncio as redis
+
+from app.core.config import settings
+
+# Shared async Redis client (connection pool) for caches and streams
+redis_client = redis.from_url(settings.REDIS_URL)
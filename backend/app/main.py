@@ -1,20 +1,23 @@
 """
 Enterprise-grade FastAPI application for Complaint Intelligence Platform
 """
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 import uvicorn
 
 from app.core.config import settings
 from app.core.database import init_db
-from app.core.telemetry import setup_telemetry
+from app.services.telemetry import setup_telemetry
+from app.services.embeddings import embedding_service
+from app.services.llm import client as openai_client, llm_service
+from app.services.rollups import run_benchmark_rollup_refresher, run_user_company_stats_refresher
+from app.services.audit import run_audit_log_writer, stop_audit_log_writer, flush_audit_queue
 from app.routers import auth, complaints, stats, risk, solutions, feedback, admin
-from app.middleware.tenant import TenantMiddleware
-from app.middleware.auth import AuthMiddleware
+from app.middleware.context import ContextMiddleware
 
 
 # Setup logging
@@ -32,12 +35,26 @@ async def lifespan(app: FastAPI):
     logger.info("Starting Complaint Intelligence API...")
     await init_db()
     setup_telemetry()
+    rollup_task = asyncio.create_task(run_benchmark_rollup_refresher())
+    history_task = asyncio.create_task(run_user_company_stats_refresher())
+    audit_task = asyncio.create_task(run_audit_log_writer())
+    vector_index_task = asyncio.create_task(embedding_service.load_vector_indices())
+    llm_warm_up_task = asyncio.create_task(llm_service.warm_up())
     logger.info("Application startup complete")
     
     yield
     
     # Shutdown
     logger.info("Shutting down Complaint Intelligence API...")
+    rollup_task.cancel()
+    history_task.cancel()
+    vector_index_task.cancel()
+    llm_warm_up_task.cancel()
+    # Let the writer finish the batch it holds rather than cancelling mid-INSERT
+    await stop_audit_log_writer()
+    await audit_task
+    await flush_audit_queue()
+    await openai_client.close()
 
 
 # Create FastAPI application
@@ -47,12 +64,10 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs" if settings.ENVIRONMENT == "development" else None,
     redoc_url="/redoc" if settings.ENVIRONMENT == "development" else None,
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-# Security middleware
-app.add_middleware(TrustedHostMiddleware, allowed_hosts=["*"])
-
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -60,11 +75,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Custom middleware
-app.add_middleware(TenantMiddleware)
-app.add_middleware(AuthMiddleware)
+app.add_middleware(ContextMiddleware)
 
 # Include routers
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authentication"])
@@ -96,7 +111,7 @@ async def health_check():
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler"""
     logger.error(f"Global exception: {exc}", exc_info=True)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "Internal server error"}
     )
@@ -0,0 +1,45 @@
+import logging
+from contextvars import ContextVar
+from typing import Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Request-scoped tenant and auth context, readable outside the request object
+tenant_id_var: ContextVar[Optional[str]] = ContextVar("tenant_id", default=None)
+auth_header_var: ContextVar[Optional[str]] = ContextVar("auth_header", default=None)
+
+
+class ContextMiddleware:
+    """Pure ASGI middleware storing tenant and auth headers in request state"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Extract tenant and auth information in one pass over the headers
+        tenant_id = None
+        auth_header = None
+        for name, value in scope["headers"]:
+            if name == b"x-tenant-id":
+                tenant_id = value.decode("latin-1")
+            elif name == b"authorization":
+                auth_header = value.decode("latin-1")
+
+        # Store context in request state
+        state = scope.setdefault("state", {})
+        state["tenant_id"] = tenant_id
+        state["auth_header"] = auth_header
+
+        tenant_token = tenant_id_var.set(tenant_id)
+        auth_token = auth_header_var.set(auth_header)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            tenant_id_var.reset(tenant_token)
+            auth_header_var.reset(auth_token)
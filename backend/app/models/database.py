@@ -6,15 +6,17 @@ from sqlalchemy import (
     String,
     Text,
     Float,
+    Date,
     DateTime,
     Boolean,
     JSON,
+    Computed,
     ForeignKey,
     Index,
 )
 from sqlalchemy.dialects.mysql import BIGINT, VARCHAR
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from tidb_vector.sqlalchemy import VectorType
 
 from app.core.database import Base
 
@@ -30,8 +32,8 @@ class User(Base):
     tenant_id = Column(VARCHAR(36), nullable=False, index=True)
     role = Column(VARCHAR(50), nullable=False, default="consumer")
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=func.now())
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
 class Tenant(Base):
@@ -42,8 +44,8 @@ class Tenant(Base):
     domain = Column(VARCHAR(255), unique=True, nullable=False)
     is_active = Column(Boolean, default=True)
     settings = Column(JSON, default={})
-    created_at = Column(DateTime, default=func.now())
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
 class ComplaintRaw(Base):
@@ -56,16 +58,21 @@ class ComplaintRaw(Base):
     product = Column(VARCHAR(255), nullable=True)
     issue = Column(VARCHAR(255), nullable=True)
     company = Column(VARCHAR(255), nullable=True)
+    # Native TiDB vector column with an HNSW index for cosine distance
     embedding = Column(
-        Text, nullable=True
-    )  # VECTOR(1536) - stored as JSON string for now
-    created_at = Column(DateTime, default=func.now())
+        VectorType(1536), nullable=True, comment="hnsw(distance=cosine)"
+    )
+    # Latest risk assessment, denormalized so listings need no risk_scores join
+    latest_risk = Column(Float, nullable=True, index=True)
+    latest_risk_category = Column(VARCHAR(16), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
-    # Relationships
-    labels = relationship("ComplaintLabel", back_populates="complaint")
-    risk_scores = relationship("RiskScore", back_populates="complaint")
-    solutions = relationship("Solution", back_populates="complaint")
-    feedback = relationship("Feedback", back_populates="complaint")
+    # Relationships; async sessions cannot lazy-load, so related rows are
+    # joined or projected explicitly and implicit per-row loads raise
+    labels = relationship("ComplaintLabel", back_populates="complaint", lazy="raise")
+    risk_scores = relationship("RiskScore", back_populates="complaint", lazy="raise")
+    solutions = relationship("Solution", back_populates="complaint", lazy="raise")
+    feedback = relationship("Feedback", back_populates="complaint", lazy="raise")
 
 
 class ComplaintLabel(Base):
@@ -78,10 +85,10 @@ class ComplaintLabel(Base):
     issue = Column(VARCHAR(255), nullable=True)
     company = Column(VARCHAR(255), nullable=True)
     confidence = Column(Float, nullable=True)
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
-    complaint = relationship("ComplaintRaw", back_populates="labels")
+    complaint = relationship("ComplaintRaw", back_populates="labels", lazy="raise")
 
 
 class RiskScore(Base):
@@ -95,10 +102,10 @@ class RiskScore(Base):
     factors = Column(JSON, default={})
     model_version = Column(VARCHAR(50), nullable=False)
     confidence = Column(Float, nullable=True)
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
-    complaint = relationship("ComplaintRaw", back_populates="risk_scores")
+    complaint = relationship("ComplaintRaw", back_populates="risk_scores", lazy="raise")
 
 
 class Solution(Base):
@@ -109,10 +116,10 @@ class Solution(Base):
     tenant_id = Column(VARCHAR(36), nullable=False, index=True)
     solution_text = Column(Text, nullable=False)
     resolution_strategy = Column(VARCHAR(255), nullable=True)
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
-    complaint = relationship("ComplaintRaw", back_populates="solutions")
+    complaint = relationship("ComplaintRaw", back_populates="solutions", lazy="raise")
 
 
 class Feedback(Base):
@@ -123,10 +130,10 @@ class Feedback(Base):
     tenant_id = Column(VARCHAR(36), nullable=False, index=True)
     rating = Column(Integer, nullable=False)
     comment = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
-    complaint = relationship("ComplaintRaw", back_populates="feedback")
+    complaint = relationship("ComplaintRaw", back_populates="feedback", lazy="raise")
 
 
 class AuditLog(Base):
@@ -137,11 +144,86 @@ class AuditLog(Base):
     user_id = Column(VARCHAR(36), nullable=True, index=True)
     action = Column(VARCHAR(255), nullable=False)
     payload = Column(JSON, default={})
-    created_at = Column(DateTime, default=func.now())
+    # User the entry is about, extracted at write time into the index so
+    # filters need no per-row JSON parse; virtual, since TiDB can only add a
+    # generated column to an existing table that way (migration 0003)
+    target_user_id = Column(
+        VARCHAR(36),
+        Computed(
+            "JSON_UNQUOTE(COALESCE(JSON_EXTRACT(payload, '$.user_id'), "
+            "JSON_EXTRACT(payload, '$.created_user_id')))",
+            persisted=False,
+        ),
+        index=True,
+    )
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class BulkJob(Base):
+    """OpenAI Batch API job for offline complaint analysis, keyed by the batch id"""
+
+    __tablename__ = "bulk_jobs"
+
+    id = Column(VARCHAR(64), primary_key=True)
+    status = Column(VARCHAR(32), nullable=False)
+    request_count = Column(Integer, nullable=False)
+    output_file_id = Column(VARCHAR(64), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ComplaintBenchmarkDaily(Base):
+    """Daily OLAP rollup of complaints per tenant/product/issue, refreshed in the background"""
+
+    __tablename__ = "complaint_benchmarks_daily"
+
+    tenant_id = Column(VARCHAR(36), primary_key=True)
+    product = Column(VARCHAR(255), primary_key=True, default="")
+    issue = Column(VARCHAR(255), primary_key=True, default="")
+    day = Column(Date, primary_key=True)
+    total_complaints = Column(Integer, nullable=False, default=0)
+    resolved_count = Column(Integer, nullable=False, default=0)
+    sum_resolution_hours = Column(Float, nullable=False, default=0.0)
+    rated_count = Column(Integer, nullable=False, default=0)
+    sum_rating = Column(Float, nullable=False, default=0.0)
+    success_count = Column(Integer, nullable=False, default=0)
+    high_risk_count = Column(Integer, nullable=False, default=0)
+    risk_count = Column(Integer, nullable=False, default=0)
+    sum_risk = Column(Float, nullable=False, default=0.0)
+    refreshed_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class UserCompanyStats(Base):
+    """Trailing-year complaint counts per user, per company and per user/company pair
+
+    Rows with an empty company are user totals, rows with an empty user_id
+    company totals; incremented on ingest and re-derived by a daily refresh.
+    """
+
+    __tablename__ = "user_company_stats"
+
+    tenant_id = Column(VARCHAR(36), primary_key=True)
+    user_id = Column(VARCHAR(36), primary_key=True, default="")
+    company = Column(VARCHAR(255), primary_key=True, default="")
+    complaint_count = Column(Integer, nullable=False, default=0)
+    last_complaint_at = Column(DateTime, nullable=True)
 
 
 # Indexes for performance
-Index("idx_complaints_tenant_created", ComplaintRaw.tenant_id, ComplaintRaw.created_at)
+# The tenant/created_at/id indexes end in the one column the stats and trend
+# aggregates also read, so those are served from the index alone while the
+# listings still get (created_at, id) keyset order
+Index("idx_complaints_tenant_created_issue", ComplaintRaw.tenant_id, ComplaintRaw.created_at.desc(), ComplaintRaw.id.desc(), ComplaintRaw.issue)
 Index("idx_complaints_product_issue", ComplaintRaw.product, ComplaintRaw.issue)
 Index("idx_risk_scores_tenant_risk", RiskScore.tenant_id, RiskScore.risk)
-Index("idx_feedback_tenant_rating", Feedback.tenant_id, Feedback.rating)
+Index("idx_complaints_tenant_product_issue_created", ComplaintRaw.tenant_id, ComplaintRaw.product, ComplaintRaw.issue, ComplaintRaw.created_at.desc())
+Index("idx_feedback_tenant_rating_created", Feedback.tenant_id, Feedback.rating, Feedback.created_at.desc())
+Index("idx_feedback_tenant_created_rating", Feedback.tenant_id, Feedback.created_at.desc(), Feedback.id.desc(), Feedback.rating)
+Index("idx_feedback_complaint_tenant_created", Feedback.complaint_id, Feedback.tenant_id, Feedback.created_at.desc())
+Index("idx_users_tenant_role_created", User.tenant_id, User.role, User.created_at.desc())
+Index("idx_audit_tenant_action_created", AuditLog.tenant_id, AuditLog.action, AuditLog.created_at.desc())
+Index("idx_tenants_created", Tenant.created_at.desc())
+Index("idx_risk_scores_tenant_created_category", RiskScore.tenant_id, RiskScore.created_at.desc(), RiskScore.id.desc(), RiskScore.category)
+Index("idx_risk_scores_tenant_category_created", RiskScore.tenant_id, RiskScore.category, RiskScore.created_at.desc(), RiskScore.id.desc())
+Index("idx_solutions_tenant_created", Solution.tenant_id, Solution.created_at.desc(), Solution.id.desc())
+Index("idx_risk_scores_complaint_risk", RiskScore.complaint_id, RiskScore.risk)
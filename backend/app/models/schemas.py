@@ -1,8 +1,7 @@
 from datetime import datetime
-from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Any, Literal, Tuple
+from pydantic import BaseModel, ConfigDict, Field
 from enum import Enum
-from langchain_core.messages import BaseMessage
 
 
 class UserRole(str, Enum):
@@ -37,11 +36,13 @@ class ComplaintState(BaseModel):
 
     # Additional processing data
     redacted_narrative: str = ""
+    narrative_embedding: List[float] = []
     pii_detected: bool = False
     metadata: Dict[str, Any] = {}
 
     # Workflow metadata
-    messages: List[BaseMessage] = []
+    # (role, content) pairs; plain tuples avoid per-message model validation
+    messages: List[Tuple[str, str]] = []
     current_agent: str = ""
     processing_steps: List[Dict[str, Any]] = []
     errors: List[str] = []
@@ -111,6 +112,50 @@ class ComplaintAnalysis(BaseModel):
     risk_assessment: Dict[str, Any]
     similar_complaints: List[Dict[str, Any]]
     benchmarks: Dict[str, Any]
+    agent_communications: List[Dict[str, Any]] = []
+
+
+# Structured output of the single-request narrative analysis; extra="forbid"
+# and no defaults so the JSON schema satisfies strict mode
+class ExtractedEntities(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    
+    product: Optional[str]
+    issue: Optional[str]
+    company: Optional[str]
+    amount: Optional[str]
+    date: Optional[str]
+
+
+class NarrativeClassification(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    
+    product_category: Literal[
+        "credit_card", "loan", "mortgage", "deposit_account",
+        "money_transfer", "debt_collection", "credit_reporting", "other"
+    ]
+    issue_category: Literal[
+        "unauthorized_charges", "billing_dispute", "service_quality", "account_access",
+        "fraud", "privacy", "discrimination", "other"
+    ]
+    urgency_level: Literal["low", "medium", "high", "critical"]
+
+
+class NarrativeSentiment(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    
+    sentiment: Literal["positive", "negative", "neutral"]
+    emotion: Literal["angry", "frustrated", "disappointed", "confused", "other"]
+    urgency_indicators: List[str]
+    escalation_risk: Literal["low", "medium", "high"]
+
+
+class NarrativeAnalysis(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    
+    entities: ExtractedEntities
+    sentiment: NarrativeSentiment
+    classification: NarrativeClassification
 
 
 # Risk schemas
@@ -193,6 +238,11 @@ class TenantResponse(BaseModel):
     is_active: bool
     settings: Dict[str, Any]
     created_at: datetime
+    # Only populated when the listing is requested with include=counts
+    total_users: Optional[int] = None
+    active_users: Optional[int] = None
+    complaints: Optional[int] = None
+    high_risk_complaints: Optional[int] = None
 
 
 class AuditLog(BaseModel):
@@ -1,23 +1,75 @@
 """
 Admin and tenant management endpoints
 """
+import asyncio
 import logging
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, desc
-import uuid
+from sqlalchemy import select, and_, desc, insert, update, bindparam, case, func
 
 from app.core.database import get_db
-from app.models.database import User, Tenant, AuditLog
+from app.core.ids import uuid7
+from app.models.database import User, Tenant, AuditLog, ComplaintRaw
 from app.models.schemas import TenantCreate, TenantResponse, AuditLog as AuditLogSchema, UserCreate, User as UserSchema
 from app.services.auth import get_current_user
 from app.services.telemetry import trace_endpoint
-from app.routers.auth import get_password_hash
+from app.services.audit import record_audit
+from app.routers.auth import get_password_hash, invalidate_cached_user
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Module-level statements so SQLAlchemy's compiled cache hits them by identity
+_TENANT_BY_DOMAIN = select(Tenant).where(Tenant.domain == bindparam("domain"))
+_USER_BY_EMAIL_TENANT = select(User).where(
+    User.email == bindparam("email"),
+    User.tenant_id == bindparam("tenant_id")
+)
+# UPDATE parameters must not share a column's name, or SQLAlchemy would also
+# treat them as SET values
+_UPDATE_USER_ROLE = update(User).where(
+    User.id == bindparam("user_id"),
+    User.tenant_id == bindparam("user_tenant_id")
+).values(role=bindparam("role")).execution_options(synchronize_session=False)
+_DEACTIVATE_USER = update(User).where(
+    User.id == bindparam("user_id"),
+    User.tenant_id == bindparam("user_tenant_id")
+).values(is_active=False).execution_options(synchronize_session=False)
+
+_TENANT_COLUMNS = (
+    Tenant.id,
+    Tenant.name,
+    Tenant.domain,
+    Tenant.is_active,
+    Tenant.settings,
+    Tenant.created_at
+)
+
+# Per-tenant counts aggregated once and joined, instead of N follow-up queries
+_USER_COUNTS = select(
+    User.tenant_id,
+    func.count().label("total_users"),
+    func.count(case((User.is_active == True, 1))).label("active_users")
+).group_by(User.tenant_id).subquery()
+_COMPLAINT_COUNTS = select(
+    ComplaintRaw.tenant_id,
+    func.count().label("complaints"),
+    func.count(case((ComplaintRaw.latest_risk_category == "high", 1))).label("high_risk_complaints")
+).group_by(ComplaintRaw.tenant_id).subquery()
+_TENANTS_WITH_COUNTS = select(
+    *_TENANT_COLUMNS,
+    func.coalesce(_USER_COUNTS.c.total_users, 0).label("total_users"),
+    func.coalesce(_USER_COUNTS.c.active_users, 0).label("active_users"),
+    func.coalesce(_COMPLAINT_COUNTS.c.complaints, 0).label("complaints"),
+    func.coalesce(_COMPLAINT_COUNTS.c.high_risk_complaints, 0).label("high_risk_complaints")
+).outerjoin(
+    _USER_COUNTS, _USER_COUNTS.c.tenant_id == Tenant.id
+).outerjoin(
+    _COMPLAINT_COUNTS, _COMPLAINT_COUNTS.c.tenant_id == Tenant.id
+)
+
 
 def require_admin_role(current_user: User = Depends(get_current_user)):
     """Dependency to require admin role"""
@@ -39,8 +91,7 @@ async def create_tenant(
     """Create a new tenant (super admin only)"""
     try:
         # Check if tenant domain already exists
-        existing_query = select(Tenant).where(Tenant.domain == tenant.domain)
-        existing_result = await db.execute(existing_query)
+        existing_result = await db.execute(_TENANT_BY_DOMAIN, {"domain": tenant.domain})
         existing_tenant = existing_result.scalar_one_or_none()
         
         if existing_tenant:
@@ -51,7 +102,7 @@ async def create_tenant(
         
         # Create tenant
         db_tenant = Tenant(
-            id=str(uuid.uuid4()),
+            id=uuid7(),
             name=tenant.name,
             domain=tenant.domain,
             settings=tenant.settings or {}
@@ -59,19 +110,15 @@ async def create_tenant(
         
         db.add(db_tenant)
         await db.commit()
-        await db.refresh(db_tenant)
-        
-        # Log action
-        audit_log = AuditLog(
-            tenant_id=current_user.tenant_id,
-            user_id=current_user.id,
-            action="tenant_created",
-            payload={"tenant_id": db_tenant.id, "tenant_name": tenant.name}
+        
+        record_audit(
+            current_user.tenant_id,
+            current_user.id,
+            "tenant_created",
+            {"tenant_id": db_tenant.id, "tenant_name": tenant.name}
         )
-        db.add(audit_log)
-        await db.commit()
         
-        return TenantResponse(
+        return TenantResponse.model_construct(
             id=db_tenant.id,
             name=db_tenant.name,
             domain=db_tenant.domain,
@@ -95,27 +142,20 @@ async def create_tenant(
 async def get_tenants(
     skip: int = 0,
     limit: int = 100,
+    include: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_admin_role)
 ):
-    """Get all tenants (admin only)"""
+    """Get all tenants (admin only); include=counts adds user and complaint counts"""
     try:
-        query = select(Tenant).offset(skip).limit(limit).order_by(desc(Tenant.created_at))
+        # Select plain columns and encode the row mappings straight to JSON,
+        # skipping ORM hydration and response-model validation
+        query = _TENANTS_WITH_COUNTS if include == "counts" else select(*_TENANT_COLUMNS)
+        query = query.offset(skip).limit(limit).order_by(desc(Tenant.created_at))
         
         result = await db.execute(query)
-        tenants = result.scalars().all()
         
-        return [
-            TenantResponse(
-                id=t.id,
-                name=t.name,
-                domain=t.domain,
-                is_active=t.is_active,
-                settings=t.settings,
-                created_at=t.created_at
-            )
-            for t in tenants
-        ]
+        return ORJSONResponse([dict(row) for row in result.mappings()])
         
     except Exception as e:
         logger.error(f"Error getting tenants: {e}")
@@ -136,7 +176,16 @@ async def get_tenant_users(
 ):
     """Get users for current tenant"""
     try:
-        query = select(User).where(User.tenant_id == current_user.tenant_id)
+        query = select(
+            User.id,
+            User.email,
+            User.first_name,
+            User.last_name,
+            User.tenant_id,
+            User.role,
+            User.is_active,
+            User.created_at
+        ).where(User.tenant_id == current_user.tenant_id)
         
         if role:
             query = query.where(User.role == role)
@@ -144,21 +193,8 @@ async def get_tenant_users(
         query = query.offset(skip).limit(limit).order_by(desc(User.created_at))
         
         result = await db.execute(query)
-        users = result.scalars().all()
         
-        return [
-            UserSchema(
-                id=u.id,
-                email=u.email,
-                first_name=u.first_name,
-                last_name=u.last_name,
-                tenant_id=u.tenant_id,
-                role=u.role,
-                is_active=u.is_active,
-                created_at=u.created_at
-            )
-            for u in users
-        ]
+        return ORJSONResponse([dict(row) for row in result.mappings()])
         
     except Exception as e:
         logger.error(f"Error getting tenant users: {e}")
@@ -178,13 +214,10 @@ async def create_tenant_user(
     """Create user for current tenant"""
     try:
         # Check if user already exists
-        existing_query = select(User).where(
-            and_(
-                User.email == user_data.email,
-                User.tenant_id == current_user.tenant_id
-            )
+        existing_result = await db.execute(
+            _USER_BY_EMAIL_TENANT,
+            {"email": user_data.email, "tenant_id": current_user.tenant_id}
         )
-        existing_result = await db.execute(existing_query)
         existing_user = existing_result.scalar_one_or_none()
         
         if existing_user:
@@ -194,9 +227,9 @@ async def create_tenant_user(
             )
         
         # Create user
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await get_password_hash(user_data.password)
         db_user = User(
-            id=str(uuid.uuid4()),
+            id=uuid7(),
             email=user_data.email,
             hashed_password=hashed_password,
             first_name=user_data.first_name,
@@ -207,19 +240,15 @@ async def create_tenant_user(
         
         db.add(db_user)
         await db.commit()
-        await db.refresh(db_user)
-        
-        # Log action
-        audit_log = AuditLog(
-            tenant_id=current_user.tenant_id,
-            user_id=current_user.id,
-            action="user_created",
-            payload={"created_user_id": db_user.id, "email": user_data.email, "role": user_data.role.value}
+        
+        record_audit(
+            current_user.tenant_id,
+            current_user.id,
+            "user_created",
+            {"created_user_id": db_user.id, "email": user_data.email, "role": user_data.role.value}
         )
-        db.add(audit_log)
-        await db.commit()
         
-        return UserSchema(
+        return UserSchema.model_construct(
             id=db_user.id,
             email=db_user.email,
             first_name=db_user.first_name,
@@ -240,38 +269,131 @@ async def create_tenant_user(
         )
 
 
+@router.post("/users/bulk", response_model=List[UserSchema])
+@trace_endpoint
+async def create_tenant_users_bulk(
+    users_data: List[UserCreate],
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_admin_role)
+):
+    """Create many users for current tenant in one transaction"""
+    try:
+        if not users_data:
+            return []
+        
+        emails = [user_data.email for user_data in users_data]
+        if len(set(emails)) != len(emails):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Duplicate emails in request"
+            )
+        
+        # Check if any user already exists
+        existing_query = select(User.email).where(
+            and_(
+                User.email.in_(emails),
+                User.tenant_id == current_user.tenant_id
+            )
+        )
+        existing_result = await db.execute(existing_query)
+        existing_emails = existing_result.scalars().all()
+        
+        if existing_emails:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Users already exist: {', '.join(existing_emails)}"
+            )
+        
+        # Hash passwords concurrently on the password pool
+        hashed_passwords = await asyncio.gather(*[
+            get_password_hash(user_data.password) for user_data in users_data
+        ])
+        
+        user_rows = [
+            {
+                "id": uuid7(),
+                "email": user_data.email,
+                "hashed_password": hashed_password,
+                "first_name": user_data.first_name,
+                "last_name": user_data.last_name,
+                "tenant_id": current_user.tenant_id,  # Use admin's tenant
+                "role": user_data.role.value
+            }
+            for user_data, hashed_password in zip(users_data, hashed_passwords)
+        ]
+        
+        # One multi-row INSERT and a single commit for all users
+        await db.execute(insert(User), user_rows)
+        await db.commit()
+        
+        for row in user_rows:
+            record_audit(
+                current_user.tenant_id,
+                current_user.id,
+                "user_created",
+                {"created_user_id": row["id"], "email": row["email"], "role": row["role"]}
+            )
+        
+        created_query = select(User).where(
+            User.id.in_([row["id"] for row in user_rows])
+        ).order_by(User.email)
+        created_result = await db.execute(created_query)
+        
+        return [
+            UserSchema.model_construct(
+                id=u.id,
+                email=u.email,
+                first_name=u.first_name,
+                last_name=u.last_name,
+                tenant_id=u.tenant_id,
+                role=u.role,
+                is_active=u.is_active,
+                created_at=u.created_at
+            )
+            for u in created_result.scalars().all()
+        ]
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error creating users in bulk: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to create users"
+        )
+
+
 @router.get("/audit-logs", response_model=List[AuditLogSchema])
 @trace_endpoint
 async def get_audit_logs(
     skip: int = 0,
     limit: int = 100,
     action: Optional[str] = None,
+    target_user_id: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_admin_role)
 ):
     """Get audit logs for tenant"""
     try:
-        query = select(AuditLog).where(AuditLog.tenant_id == current_user.tenant_id)
+        query = select(
+            AuditLog.id,
+            AuditLog.tenant_id,
+            AuditLog.user_id,
+            AuditLog.action,
+            AuditLog.payload,
+            AuditLog.created_at
+        ).where(AuditLog.tenant_id == current_user.tenant_id)
         
         if action:
             query = query.where(AuditLog.action == action)
+        if target_user_id:
+            query = query.where(AuditLog.target_user_id == target_user_id)
         
         query = query.offset(skip).limit(limit).order_by(desc(AuditLog.created_at))
         
         result = await db.execute(query)
-        logs = result.scalars().all()
         
-        return [
-            AuditLogSchema(
-                id=log.id,
-                tenant_id=log.tenant_id,
-                user_id=log.user_id,
-                action=log.action,
-                payload=log.payload,
-                created_at=log.created_at
-            )
-            for log in logs
-        ]
+        return ORJSONResponse([dict(row) for row in result.mappings()])
         
     except Exception as e:
         logger.error(f"Error getting audit logs: {e}")
@@ -291,22 +413,6 @@ async def update_user_role(
 ):
     """Update user role"""
     try:
-        # Get user
-        user_query = select(User).where(
-            and_(
-                User.id == user_id,
-                User.tenant_id == current_user.tenant_id
-            )
-        )
-        user_result = await db.execute(user_query)
-        user = user_result.scalar_one_or_none()
-        
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-        
         # Validate role
         valid_roles = ["consumer", "analyst", "admin"]
         if new_role not in valid_roles:
@@ -315,19 +421,25 @@ async def update_user_role(
                 detail=f"Invalid role. Must be one of: {valid_roles}"
             )
         
-        old_role = user.role
-        user.role = new_role
+        # Single UPDATE; a zero rowcount means no such user in this tenant
+        result = await db.execute(
+            _UPDATE_USER_ROLE,
+            {"user_id": user_id, "user_tenant_id": current_user.tenant_id, "role": new_role}
+        )
+        if result.rowcount == 0:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
         await db.commit()
         
-        # Log action
-        audit_log = AuditLog(
-            tenant_id=current_user.tenant_id,
-            user_id=current_user.id,
-            action="user_role_updated",
-            payload={"user_id": user_id, "old_role": old_role, "new_role": new_role}
+        record_audit(
+            current_user.tenant_id,
+            current_user.id,
+            "user_role_updated",
+            {"user_id": user_id, "new_role": new_role}
         )
-        db.add(audit_log)
-        await db.commit()
+        invalidate_cached_user(user_id)
         
         return {"message": "User role updated successfully", "user_id": user_id, "new_role": new_role}
         
@@ -350,41 +462,31 @@ async def deactivate_user(
 ):
     """Deactivate user (soft delete)"""
     try:
-        # Get user
-        user_query = select(User).where(
-            and_(
-                User.id == user_id,
-                User.tenant_id == current_user.tenant_id
-            )
-        )
-        user_result = await db.execute(user_query)
-        user = user_result.scalar_one_or_none()
-        
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-        
         # Prevent self-deactivation
-        if user.id == current_user.id:
+        if user_id == current_user.id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Cannot deactivate your own account"
             )
         
-        user.is_active = False
+        result = await db.execute(
+            _DEACTIVATE_USER,
+            {"user_id": user_id, "user_tenant_id": current_user.tenant_id}
+        )
+        if result.rowcount == 0:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
         await db.commit()
         
-        # Log action
-        audit_log = AuditLog(
-            tenant_id=current_user.tenant_id,
-            user_id=current_user.id,
-            action="user_deactivated",
-            payload={"user_id": user_id, "email": user.email}
+        record_audit(
+            current_user.tenant_id,
+            current_user.id,
+            "user_deactivated",
+            {"user_id": user_id}
         )
-        db.add(audit_log)
-        await db.commit()
+        invalidate_cached_user(user_id)
         
         return {"message": "User deactivated successfully", "user_id": user_id}
         
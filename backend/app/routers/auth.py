@@ -1,71 +1,183 @@
 """
 Authentication and authorization endpoints
 """
+import asyncio
+import hashlib
 import logging
-from datetime import datetime, timedelta
-from typing import Optional
+import os
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import lru_cache
+from typing import Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from passlib.context import CryptContext
+from sqlalchemy import select, text, bindparam
+from sqlalchemy.exc import IntegrityError
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+import bcrypt
 from jose import JWTError, jwt
-import uuid
 
 from app.core.database import get_db
+from app.core.ids import uuid7
 from app.core.config import settings
-from app.models.database import User, Tenant
+from app.models.database import User
 from app.models.schemas import UserCreate, UserLogin, Token, User as UserSchema
 from app.services.telemetry import trace_endpoint
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# Security
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Security: new hashes use argon2id; legacy bcrypt hashes still verify
+# and are upgraded on the next successful login
+password_hasher = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/token")
 
+# Token signing parameters resolved once at import
+_JWT_KEY = settings.SECRET_KEY
+_JWT_ALGORITHM = settings.ALGORITHM
+_JWT_ALGORITHMS = [settings.ALGORITHM]
+_DEFAULT_TOKEN_TTL = 15 * 60
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify password"""
-    return pwd_context.verify(plain_password, hashed_password)
+# Dedicated pool so password hashing is bounded by cores and cannot starve
+# the default executor used by other offloaded work
+_password_executor = ThreadPoolExecutor(
+    max_workers=os.cpu_count(), thread_name_prefix="password-hash"
+)
 
+# Short-lived LRU of (expires_at, user) keyed by user id, so repeated
+# requests from the same user skip the lookup whichever token they carry
+_USER_CACHE_TTL = 30
+_USER_CACHE_SIZE = 10_000
+_user_cache: "OrderedDict[str, Tuple[float, User]]" = OrderedDict()
 
-def get_password_hash(password: str) -> str:
-    """Hash password"""
-    return pwd_context.hash(password)
+# Recently failed (tenant, email, password) attempts, so a repeated wrong
+# guess is rejected without another KDF run. Keys are keyed-BLAKE2b digests
+# under a per-process secret; entries only ever record wrong passwords
+_FAILED_LOGIN_TTL = 60
+_FAILED_LOGIN_CACHE_SIZE = 50_000
+_FAILED_LOGIN_DIGEST_KEY = os.urandom(32)
+_failed_logins: "OrderedDict[bytes, float]" = OrderedDict()
+
+# OAuth2 username is "<email>_<tenant_id>"; the tenant follows the last
+# underscore after the "@" and defaults to "default" when absent
+_USERNAME_RE = re.compile(r"^(?P<email>[^@]*@[^@_]*)(?:_[^@]*?(?P<tenant>[^@_]*))?$")
+
+# Module-level statements so SQLAlchemy's compiled cache hits them by identity
+_ACTIVE_USER_BY_EMAIL = select(User).where(
+    User.email == bindparam("email"),
+    User.tenant_id == bindparam("tenant_id"),
+    User.is_active == True
+)
+_ACTIVE_USER_BY_ID = select(User).where(
+    User.id == bindparam("user_id"),
+    User.tenant_id == bindparam("tenant_id"),
+    User.is_active == True
+)
+
+# Registration pre-checks for tenant and existing user in one round-trip
+_REGISTRATION_CHECK_SQL = text(
+    """
+        SELECT
+            EXISTS(SELECT 1 FROM tenants WHERE id = :tenant_id AND is_active) AS tenant_active,
+            EXISTS(
+                SELECT 1 FROM users
+                WHERE email = :email AND tenant_id = :tenant_id AND is_active
+            ) AS user_exists
+    """
+)
+
+
+@lru_cache(maxsize=2048)
+def _decode_token_cached(token: str) -> Tuple[Optional[str], Optional[str], float]:
+    """Verify and decode a token once, returning (user_id, tenant_id, exp)"""
+    payload = jwt.decode(token, _JWT_KEY, algorithms=_JWT_ALGORITHMS)
+    return payload.get("sub"), payload.get("tenant_id"), float(payload.get("exp", 0))
+
+
+def invalidate_cached_user(user_id: str) -> None:
+    """Drop the cached lookup for a user whose role or status changed"""
+    _user_cache.pop(user_id, None)
+
+
+def _verify_password_sync(plain_password: str, hashed_password: str) -> bool:
+    """Verify an argon2 or legacy bcrypt hash"""
+    try:
+        if hashed_password.startswith("$argon2"):
+            return password_hasher.verify(hashed_password, plain_password)
+        return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+    except (VerificationError, InvalidHashError, ValueError):
+        return False
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Whether a stored hash is bcrypt or uses outdated argon2 parameters"""
+    if not hashed_password.startswith("$argon2"):
+        return True
+    return password_hasher.check_needs_rehash(hashed_password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify password off the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(
+        _password_executor, _verify_password_sync, plain_password, hashed_password
+    )
+
+
+async def get_password_hash(password: str) -> str:
+    """Hash password off the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(
+        _password_executor, password_hasher.hash, password
+    )
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
+    ttl = expires_delta.total_seconds() if expires_delta else _DEFAULT_TOKEN_TTL
+    return jwt.encode(
+        {**data, "exp": int(time.time() + ttl)}, _JWT_KEY, algorithm=_JWT_ALGORITHM
+    )
 
 
 async def get_user_by_email(db: AsyncSession, email: str, tenant_id: str) -> Optional[User]:
     """Get user by email and tenant"""
-    query = select(User).where(
-        User.email == email,
-        User.tenant_id == tenant_id,
-        User.is_active == True
+    result = await db.execute(
+        _ACTIVE_USER_BY_EMAIL, {"email": email, "tenant_id": tenant_id}
     )
-    result = await db.execute(query)
     return result.scalar_one_or_none()
 
 
 async def authenticate_user(db: AsyncSession, email: str, password: str, tenant_id: str) -> Optional[User]:
     """Authenticate user"""
+    attempt_key = hashlib.blake2b(
+        f"{tenant_id}\0{email}\0{password}".encode(),
+        key=_FAILED_LOGIN_DIGEST_KEY,
+        digest_size=16
+    ).digest()
+    failed_until = _failed_logins.get(attempt_key)
+    if failed_until and failed_until > time.monotonic():
+        return None
+    
     user = await get_user_by_email(db, email, tenant_id)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password(password, user.hashed_password):
+        _failed_logins[attempt_key] = time.monotonic() + _FAILED_LOGIN_TTL
+        _failed_logins.move_to_end(attempt_key)
+        if len(_failed_logins) > _FAILED_LOGIN_CACHE_SIZE:
+            _failed_logins.popitem(last=False)
         return None
+    if password_needs_rehash(user.hashed_password):
+        try:
+            user.hashed_password = await get_password_hash(password)
+            await db.commit()
+        except Exception as e:
+            logger.error(f"Error upgrading password hash for user {user.id}: {e}")
+            await db.rollback()
     return user
 
 
@@ -78,24 +190,30 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
     )
     
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        tenant_id: str = payload.get("tenant_id")
-        if user_id is None or tenant_id is None:
-            raise credentials_exception
+        user_id, tenant_id, expires_at = _decode_token_cached(token)
     except JWTError:
         raise credentials_exception
+    # Expiry is re-checked on every call since the decode result is cached
+    if user_id is None or tenant_id is None or expires_at <= time.time():
+        raise credentials_exception
     
-    query = select(User).where(
-        User.id == user_id,
-        User.tenant_id == tenant_id,
-        User.is_active == True
+    cached = _user_cache.get(user_id)
+    if cached and cached[0] > time.monotonic() and cached[1].tenant_id == tenant_id:
+        _user_cache.move_to_end(user_id)
+        return cached[1]
+    
+    result = await db.execute(
+        _ACTIVE_USER_BY_ID, {"user_id": user_id, "tenant_id": tenant_id}
     )
-    result = await db.execute(query)
     user = result.scalar_one_or_none()
     
     if user is None:
         raise credentials_exception
+    
+    _user_cache[user_id] = (time.monotonic() + _USER_CACHE_TTL, user)
+    _user_cache.move_to_end(user_id)
+    if len(_user_cache) > _USER_CACHE_SIZE:
+        _user_cache.popitem(last=False)
     return user
 
 
@@ -107,32 +225,28 @@ async def register_user(
 ):
     """Register new user"""
     try:
-        # Check if user already exists
-        existing_user = await get_user_by_email(db, user_data.email, user_data.tenant_id)
-        if existing_user:
+        # Check for an existing user and verify the tenant in one query
+        check_result = await db.execute(
+            _REGISTRATION_CHECK_SQL,
+            {"email": user_data.email, "tenant_id": user_data.tenant_id}
+        )
+        checks = check_result.one()
+        if checks.user_exists:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered"
             )
         
-        # Verify tenant exists
-        tenant_query = select(Tenant).where(
-            Tenant.id == user_data.tenant_id,
-            Tenant.is_active == True
-        )
-        tenant_result = await db.execute(tenant_query)
-        tenant = tenant_result.scalar_one_or_none()
-        
-        if not tenant:
+        if not checks.tenant_active:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid tenant"
             )
         
         # Create user
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await get_password_hash(user_data.password)
         db_user = User(
-            id=str(uuid.uuid4()),
+            id=uuid7(),
             email=user_data.email,
             hashed_password=hashed_password,
             first_name=user_data.first_name,
@@ -143,9 +257,8 @@ async def register_user(
         
         db.add(db_user)
         await db.commit()
-        await db.refresh(db_user)
         
-        return UserSchema(
+        return UserSchema.model_construct(
             id=db_user.id,
             email=db_user.email,
             first_name=db_user.first_name,
@@ -158,6 +271,13 @@ async def register_user(
         
     except HTTPException:
         raise
+    except IntegrityError:
+        # Lost a race with a concurrent registration for the same email
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
     except Exception as e:
         logger.error(f"Error registering user: {e}")
         raise HTTPException(
@@ -174,22 +294,18 @@ async def login_for_access_token(
 ):
     """Login and get access token"""
     try:
-        # Extract tenant_id from username (format: email@tenant_id)
-        if "@" not in form_data.username:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid username format"
-            )
-        
-        email_parts = form_data.username.split("@")
-        if len(email_parts) != 2:
+        # Extract email and tenant_id from username in a single match
+        username_match = _USERNAME_RE.match(form_data.username)
+        if not username_match:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid username format"
             )
         
-        email = email_parts[0] + "@" + email_parts[1].split("_")[0]  # Extract actual email
-        tenant_id = email_parts[1].split("_")[-1] if "_" in email_parts[1] else "default"
+        email = username_match.group("email")
+        tenant_id = username_match.group("tenant")
+        if tenant_id is None:
+            tenant_id = "default"
         
         user = await authenticate_user(db, email, form_data.password, tenant_id)
         if not user:
@@ -268,7 +384,7 @@ async def login_user(
 @trace_endpoint
 async def get_current_user_info(current_user: User = Depends(get_current_user)):
     """Get current user information"""
-    return UserSchema(
+    return UserSchema.model_construct(
         id=current_user.id,
         email=current_user.email,
         first_name=current_user.first_name,
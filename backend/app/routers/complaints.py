@@ -2,26 +2,113 @@
 Complaint management endpoints
 """
 import logging
+import orjson
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, func, bindparam
 
+from app.core.config import settings
 from app.core.database import get_db
-from app.models.database import ComplaintRaw, User
+from app.core.redis import redis_client
+from app.core.pagination import encode_cursor, seek_before
+from app.models.database import ComplaintRaw, ComplaintLabel, RiskScore, User
 from app.models.schemas import ComplaintCreate, ComplaintResponse, ComplaintAnalysis
 from app.services.auth import get_current_user
+from app.services.feature_cache import invalidate_user_features
+from app.services.rollups import record_user_company_complaint
+from app.services.stats_cache import invalidate_stats_cache
 from app.agents.workflow import complaint_workflow_graph
 from app.services.telemetry import trace_endpoint
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Listing columns; leaves out the embedding vector and maps the
+# denormalized latest risk onto the response field names
+_COMPLAINT_LIST_COLUMNS = (
+    ComplaintRaw.id,
+    ComplaintRaw.tenant_id,
+    ComplaintRaw.user_id,
+    ComplaintRaw.narrative,
+    ComplaintRaw.product,
+    ComplaintRaw.issue,
+    ComplaintRaw.company,
+    ComplaintRaw.created_at,
+    ComplaintRaw.latest_risk.label("risk_score"),
+    ComplaintRaw.latest_risk_category.label("risk_category")
+)
+
+_COMPLAINT_BY_ID = select(*_COMPLAINT_LIST_COLUMNS).where(
+    ComplaintRaw.id == bindparam("complaint_id"),
+    ComplaintRaw.tenant_id == bindparam("tenant_id")
+)
+
+# Complaint with its latest label and risk score in one round-trip
+_LATEST_LABEL_ID = select(func.max(ComplaintLabel.id)).where(
+    ComplaintLabel.complaint_id == ComplaintRaw.id
+).correlate(ComplaintRaw).scalar_subquery()
+_LATEST_RISK_ID = select(func.max(RiskScore.id)).where(
+    RiskScore.complaint_id == ComplaintRaw.id
+).correlate(ComplaintRaw).scalar_subquery()
+_COMPLAINT_WITH_LATEST_ANALYSIS = select(
+    ComplaintRaw, ComplaintLabel, RiskScore
+).outerjoin(
+    ComplaintLabel, ComplaintLabel.id == _LATEST_LABEL_ID
+).outerjoin(
+    RiskScore, RiskScore.id == _LATEST_RISK_ID
+)
+
+
+def _workflow_key(complaint_id: int) -> str:
+    """Marker set while a workflow run for the complaint is queued or running"""
+    return f"complaint:{complaint_id}:processing"
+
+
+async def _claim_workflow(complaint_id: int) -> bool:
+    """Mark the complaint's workflow as in progress; False if a run already holds it"""
+    try:
+        return bool(await redis_client.set(
+            _workflow_key(complaint_id), 1,
+            nx=True, ex=settings.COMPLAINT_WORKFLOW_LOCK_SECONDS
+        ))
+    except Exception as e:
+        logger.warning(f"Workflow claim for complaint {complaint_id} failed: {e}")
+        return True
+
+
+async def _release_workflow(complaint_id: int) -> None:
+    """Clear the in-progress marker once a run finishes"""
+    try:
+        await redis_client.delete(_workflow_key(complaint_id))
+    except Exception as e:
+        logger.warning(f"Workflow release for complaint {complaint_id} failed: {e}")
+
+
+async def _run_complaint_workflow(
+    complaint_id: int, narrative: str, tenant_id: str, user_id: str
+):
+    """Run the AI workflow for a new complaint after the response is sent"""
+    try:
+        await complaint_workflow_graph.process_complaint(
+            complaint_id=complaint_id,
+            narrative=narrative,
+            tenant_id=tenant_id,
+            user_id=user_id
+        )
+        logger.info(f"Complaint {complaint_id} processed successfully")
+    except Exception as e:
+        logger.error(f"Error processing complaint {complaint_id}: {e}")
+    finally:
+        await _release_workflow(complaint_id)
+
 
 @router.post("/", response_model=ComplaintResponse)
 @trace_endpoint
 async def create_complaint(
     complaint: ComplaintCreate,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -38,23 +125,27 @@ async def create_complaint(
         )
         
         db.add(db_complaint)
-        await db.flush()  # Get the ID
+        await record_user_company_complaint(
+            db, current_user.tenant_id, current_user.id, complaint.company
+        )
         await db.commit()
+        await invalidate_stats_cache(current_user.tenant_id)
+        await invalidate_user_features(
+            current_user.tenant_id, current_user.id, complaint.company
+        )
         
-        # Trigger LangGraph AI workflow
-        try:
-            workflow_result = await complaint_workflow_graph.process_complaint(
-                complaint_id=db_complaint.id,
-                narrative=complaint.narrative,
-                tenant_id=current_user.tenant_id,
-                user_id=current_user.id
-            )
-            logger.info(f"Complaint {db_complaint.id} processed successfully")
-        except Exception as e:
-            logger.error(f"Error processing complaint {db_complaint.id}: {e}")
-            # Don't fail the request if AI processing fails
+        # Run the LangGraph AI workflow after responding; the analysis
+        # endpoint reports it as processing until its results are stored
+        await _claim_workflow(db_complaint.id)
+        background_tasks.add_task(
+            _run_complaint_workflow,
+            db_complaint.id,
+            complaint.narrative,
+            current_user.tenant_id,
+            current_user.id
+        )
         
-        return ComplaintResponse(
+        return ComplaintResponse.model_construct(
             id=db_complaint.id,
             tenant_id=db_complaint.tenant_id,
             user_id=db_complaint.user_id,
@@ -78,14 +169,16 @@ async def create_complaint(
 async def get_complaints(
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     product: Optional[str] = None,
     issue: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get complaints for current tenant"""
+    """Get complaints for current tenant; pass X-Next-Cursor back as cursor for the next page"""
+    seek = seek_before(ComplaintRaw, cursor)
     try:
-        query = select(ComplaintRaw).where(
+        query = select(*_COMPLAINT_LIST_COLUMNS).where(
             ComplaintRaw.tenant_id == current_user.tenant_id
         )
         
@@ -95,25 +188,33 @@ async def get_complaints(
         if issue:
             query = query.where(ComplaintRaw.issue == issue)
         
-        # Add pagination
-        query = query.offset(skip).limit(limit).order_by(ComplaintRaw.created_at.desc())
+        # Keyset pagination when a cursor is given, so deep pages cost the same
+        if seek is not None:
+            query = query.where(seek)
+        else:
+            query = query.offset(skip)
+        query = query.limit(limit).order_by(
+            ComplaintRaw.created_at.desc(), ComplaintRaw.id.desc()
+        )
         
-        result = await db.execute(query)
-        complaints = result.scalars().all()
-        
-        return [
-            ComplaintResponse(
-                id=c.id,
-                tenant_id=c.tenant_id,
-                user_id=c.user_id,
-                narrative=c.narrative,
-                product=c.product,
-                issue=c.issue,
-                company=c.company,
-                created_at=c.created_at
+        # Stream rows off a server-side cursor and encode each one as it
+        # arrives, so long narratives are only ever held as JSON bytes
+        result = await db.stream(query.execution_options(yield_per=50))
+        encoded_rows = []
+        last_row = None
+        async for row in result.mappings():
+            encoded_rows.append(orjson.dumps(dict(row)))
+            last_row = row
+        
+        response = Response(
+            content=b"[" + b",".join(encoded_rows) + b"]",
+            media_type="application/json"
+        )
+        if len(encoded_rows) == limit:
+            response.headers["X-Next-Cursor"] = encode_cursor(
+                last_row["created_at"], last_row["id"]
             )
-            for c in complaints
-        ]
+        return response
         
     except Exception as e:
         logger.error(f"Error getting complaints: {e}")
@@ -132,15 +233,11 @@ async def get_complaint(
 ):
     """Get specific complaint"""
     try:
-        query = select(ComplaintRaw).where(
-            and_(
-                ComplaintRaw.id == complaint_id,
-                ComplaintRaw.tenant_id == current_user.tenant_id
-            )
+        result = await db.execute(
+            _COMPLAINT_BY_ID,
+            {"complaint_id": complaint_id, "tenant_id": current_user.tenant_id}
         )
-        
-        result = await db.execute(query)
-        complaint = result.scalar_one_or_none()
+        complaint = result.mappings().one_or_none()
         
         if not complaint:
             raise HTTPException(
@@ -148,16 +245,7 @@ async def get_complaint(
                 detail="Complaint not found"
             )
         
-        return ComplaintResponse(
-            id=complaint.id,
-            tenant_id=complaint.tenant_id,
-            user_id=complaint.user_id,
-            narrative=complaint.narrative,
-            product=complaint.product,
-            issue=complaint.issue,
-            company=complaint.company,
-            created_at=complaint.created_at
-        )
+        return ComplaintResponse.model_construct(**complaint)
         
     except HTTPException:
         raise
@@ -178,31 +266,39 @@ async def get_complaint_analysis(
 ):
     """Get AI analysis for specific complaint"""
     try:
-        # Verify complaint exists and belongs to tenant
-        query = select(ComplaintRaw).where(
-            and_(
-                ComplaintRaw.id == complaint_id,
-                ComplaintRaw.tenant_id == current_user.tenant_id
-            )
+        # Verify complaint exists and belongs to tenant, fetching its latest
+        # label and risk score alongside
+        query = _COMPLAINT_WITH_LATEST_ANALYSIS.where(
+            ComplaintRaw.id == complaint_id,
+            ComplaintRaw.tenant_id == current_user.tenant_id
         )
         
         result = await db.execute(query)
-        complaint = result.scalar_one_or_none()
+        row = result.one_or_none()
         
-        if not complaint:
+        if not row:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Complaint not found"
             )
+        complaint, latest_label, latest_risk = row
         
-        # If no analysis exists, trigger it
-        if not complaint.labels or not complaint.risk_scores:
-            workflow_result = await complaint_workflow_graph.process_complaint(
-                complaint_id=complaint_id,
-                narrative=complaint.narrative,
-                tenant_id=current_user.tenant_id,
-                user_id=current_user.id
-            )
+        # If no analysis exists, trigger it unless a run is already in progress
+        if not latest_label or not latest_risk:
+            if not await _claim_workflow(complaint_id):
+                return ORJSONResponse(
+                    {"complaint_id": complaint_id, "status": "processing"},
+                    status_code=status.HTTP_202_ACCEPTED
+                )
+            try:
+                workflow_result = await complaint_workflow_graph.process_complaint(
+                    complaint_id=complaint_id,
+                    narrative=complaint.narrative,
+                    tenant_id=current_user.tenant_id,
+                    user_id=current_user.id
+                )
+            finally:
+                await _release_workflow(complaint_id)
             
             return ComplaintAnalysis(
                 complaint_id=complaint_id,
@@ -210,14 +306,12 @@ async def get_complaint_analysis(
                 classification=workflow_result.get('results', {}).get('classification', {}),
                 risk_assessment=workflow_result.get('results', {}).get('risk_assessment', {}),
                 similar_complaints=workflow_result.get('results', {}).get('similar_complaints', []),
-                benchmarks=workflow_result.get('results', {}).get('benchmarks', {})
+                benchmarks=workflow_result.get('results', {}).get('benchmarks', {}),
+                agent_communications=workflow_result.get('agent_communications', [])
             )
         
         # Return existing analysis
-        latest_label = complaint.labels[-1] if complaint.labels else None
-        latest_risk = complaint.risk_scores[-1] if complaint.risk_scores else None
-        
-        return ComplaintAnalysis(
+        return ComplaintAnalysis.model_construct(
             complaint_id=complaint_id,
             entities={
                 "product": latest_label.product if latest_label else None,
@@ -234,7 +328,10 @@ async def get_complaint_analysis(
                 "factors": latest_risk.factors if latest_risk else {}
             },
             similar_complaints=[],
-            benchmarks={}
+            benchmarks={},
+            agent_communications=await complaint_workflow_graph.get_agent_communications(
+                complaint_id
+            )
         )
         
     except HTTPException:
@@ -4,18 +4,40 @@ Feedback collection endpoints
 import logging
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, desc, func
+from sqlalchemy import select, desc, func, bindparam, exists
 
 from app.core.database import get_db
+from app.core.pagination import encode_cursor, seek_before
 from app.models.database import Feedback, ComplaintRaw, User
 from app.models.schemas import FeedbackCreate, FeedbackResponse
 from app.services.auth import get_current_user
+from app.services.stats_cache import invalidate_stats_cache
 from app.services.telemetry import trace_endpoint
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Tenant ownership check that projects no columns and builds no ORM object
+_COMPLAINT_EXISTS = select(exists().where(
+    ComplaintRaw.id == bindparam("complaint_id"),
+    ComplaintRaw.tenant_id == bindparam("tenant_id")
+))
+
+_FEEDBACK_COLUMNS = (
+    Feedback.id,
+    Feedback.complaint_id,
+    Feedback.tenant_id,
+    Feedback.rating,
+    Feedback.comment,
+    Feedback.created_at
+)
+_FEEDBACK_BY_COMPLAINT = select(*_FEEDBACK_COLUMNS).where(
+    Feedback.complaint_id == bindparam("complaint_id"),
+    Feedback.tenant_id == bindparam("tenant_id")
+).order_by(desc(Feedback.created_at))
+
 
 @router.post("/", response_model=FeedbackResponse)
 @trace_endpoint
@@ -27,16 +49,12 @@ async def create_feedback(
     """Create feedback for a complaint"""
     try:
         # Verify complaint exists and belongs to tenant
-        complaint_query = select(ComplaintRaw).where(
-            and_(
-                ComplaintRaw.id == feedback.complaint_id,
-                ComplaintRaw.tenant_id == current_user.tenant_id
-            )
+        complaint_exists = await db.scalar(
+            _COMPLAINT_EXISTS,
+            {"complaint_id": feedback.complaint_id, "tenant_id": current_user.tenant_id}
         )
-        complaint_result = await db.execute(complaint_query)
-        complaint = complaint_result.scalar_one_or_none()
         
-        if not complaint:
+        if not complaint_exists:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Complaint not found"
@@ -52,9 +70,9 @@ async def create_feedback(
         
         db.add(db_feedback)
         await db.commit()
-        await db.refresh(db_feedback)
+        await invalidate_stats_cache(current_user.tenant_id)
         
-        return FeedbackResponse(
+        return FeedbackResponse.model_construct(
             id=db_feedback.id,
             complaint_id=db_feedback.complaint_id,
             tenant_id=db_feedback.tenant_id,
@@ -78,35 +96,38 @@ async def create_feedback(
 async def get_feedback(
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     rating: Optional[int] = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get feedback for tenant"""
+    """Get feedback for tenant; pass X-Next-Cursor back as cursor for the next page"""
+    seek = seek_before(Feedback, cursor)
     try:
-        query = select(Feedback).where(
+        query = select(*_FEEDBACK_COLUMNS).where(
             Feedback.tenant_id == current_user.tenant_id
         )
         
         if rating:
             query = query.where(Feedback.rating == rating)
         
-        query = query.offset(skip).limit(limit).order_by(desc(Feedback.created_at))
+        # Keyset pagination when a cursor is given, so deep pages cost the same
+        if seek is not None:
+            query = query.where(seek)
+        else:
+            query = query.offset(skip)
+        query = query.limit(limit).order_by(desc(Feedback.created_at), desc(Feedback.id))
         
         result = await db.execute(query)
-        feedback_items = result.scalars().all()
-        
-        return [
-            FeedbackResponse(
-                id=f.id,
-                complaint_id=f.complaint_id,
-                tenant_id=f.tenant_id,
-                rating=f.rating,
-                comment=f.comment,
-                created_at=f.created_at
+        feedback_items = [dict(row) for row in result.mappings()]
+        
+        # Rows are encoded straight to JSON without per-row model validation
+        response = ORJSONResponse(feedback_items)
+        if len(feedback_items) == limit:
+            response.headers["X-Next-Cursor"] = encode_cursor(
+                feedback_items[-1]["created_at"], feedback_items[-1]["id"]
             )
-            for f in feedback_items
-        ]
+        return response
         
     except Exception as e:
         logger.error(f"Error getting feedback: {e}")
@@ -126,43 +147,24 @@ async def get_feedback_by_complaint(
     """Get feedback for specific complaint"""
     try:
         # Verify complaint belongs to tenant
-        complaint_query = select(ComplaintRaw).where(
-            and_(
-                ComplaintRaw.id == complaint_id,
-                ComplaintRaw.tenant_id == current_user.tenant_id
-            )
+        complaint_exists = await db.scalar(
+            _COMPLAINT_EXISTS,
+            {"complaint_id": complaint_id, "tenant_id": current_user.tenant_id}
         )
-        complaint_result = await db.execute(complaint_query)
-        complaint = complaint_result.scalar_one_or_none()
         
-        if not complaint:
+        if not complaint_exists:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Complaint not found"
             )
         
         # Get feedback for complaint
-        feedback_query = select(Feedback).where(
-            and_(
-                Feedback.complaint_id == complaint_id,
-                Feedback.tenant_id == current_user.tenant_id
-            )
-        ).order_by(desc(Feedback.created_at))
-        
-        result = await db.execute(feedback_query)
-        feedback_items = result.scalars().all()
-        
-        return [
-            FeedbackResponse(
-                id=f.id,
-                complaint_id=f.complaint_id,
-                tenant_id=f.tenant_id,
-                rating=f.rating,
-                comment=f.comment,
-                created_at=f.created_at
-            )
-            for f in feedback_items
-        ]
+        result = await db.execute(
+            _FEEDBACK_BY_COMPLAINT,
+            {"complaint_id": complaint_id, "tenant_id": current_user.tenant_id}
+        )
+        
+        return ORJSONResponse([dict(row) for row in result.mappings()])
         
     except HTTPException:
         raise
@@ -182,14 +184,8 @@ async def get_feedback_analytics(
 ):
     """Get feedback analytics summary"""
     try:
-        # Average rating
-        avg_rating_query = select(func.avg(Feedback.rating)).where(
-            Feedback.tenant_id == current_user.tenant_id
-        )
-        avg_rating_result = await db.execute(avg_rating_query)
-        avg_rating = avg_rating_result.scalar() or 0.0
-        
-        # Rating distribution
+        # One grouped scan over the (tenant_id, rating) index; the average,
+        # total and satisfied counts all follow from the distribution
         rating_dist_query = select(
             Feedback.rating,
             func.count(Feedback.id).label('count')
@@ -198,40 +194,34 @@ async def get_feedback_analytics(
         ).group_by(Feedback.rating).order_by(Feedback.rating)
         
         rating_dist_result = await db.execute(rating_dist_query)
-        rating_distribution = {
-            str(row.rating): row.count for row in rating_dist_result
-        }
-        
-        # Total feedback count
-        total_count_query = select(func.count(Feedback.id)).where(
-            Feedback.tenant_id == current_user.tenant_id
-        )
-        total_count_result = await db.execute(total_count_query)
-        total_count = total_count_result.scalar() or 0
-        
-        # Satisfaction rate (ratings 4-5)
-        satisfied_count_query = select(func.count(Feedback.id)).where(
-            and_(
-                Feedback.tenant_id == current_user.tenant_id,
-                Feedback.rating >= 4
-            )
-        )
-        satisfied_count_result = await db.execute(satisfied_count_query)
-        satisfied_count = satisfied_count_result.scalar() or 0
-        
+        rating_distribution = {}
+        total_count = 0
+        rating_sum = 0
+        satisfied_count = 0
+        most_common_rating, most_common_count = "N/A", -1
+        for row in rating_dist_result:
+            rating_distribution[str(row.rating)] = row.count
+            if row.count > most_common_count:
+                most_common_rating, most_common_count = str(row.rating), row.count
+            total_count += row.count
+            rating_sum += row.rating * row.count
+            if row.rating >= 4:
+                satisfied_count += row.count
+        
+        avg_rating = rating_sum / total_count if total_count else 0.0
         satisfaction_rate = (satisfied_count / max(total_count, 1)) * 100
         
-        return {
+        return ORJSONResponse({
             "average_rating": round(avg_rating, 2),
             "total_feedback": total_count,
             "satisfaction_rate": round(satisfaction_rate, 2),
             "rating_distribution": rating_distribution,
             "insights": {
-                "most_common_rating": max(rating_distribution.items(), key=lambda x: x[1])[0] if rating_distribution else "N/A",
+                "most_common_rating": most_common_rating,
                 "improvement_needed": avg_rating < 3.5,
                 "performance_level": "excellent" if avg_rating >= 4.5 else "good" if avg_rating >= 3.5 else "needs_improvement"
             }
-        }
+        })
         
     except Exception as e:
         logger.error(f"Error getting feedback analytics: {e}")
@@ -4,10 +4,12 @@ Risk assessment endpoints
 import logging
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, desc
+from sqlalchemy import select, and_, desc, bindparam, func
 
 from app.core.database import get_db
+from app.core.pagination import encode_cursor, seek_before
 from app.models.database import RiskScore, ComplaintRaw, User
 from app.models.schemas import RiskAssessment
 from app.services.auth import get_current_user
@@ -16,41 +18,67 @@ from app.services.telemetry import trace_endpoint
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Listing projection in RiskAssessment field names; no ORM rows are built, so
+# nothing can lazy-load the parent complaint per row
+_RISK_ASSESSMENT_COLUMNS = (
+    RiskScore.complaint_id,
+    RiskScore.risk.label("risk_score"),
+    RiskScore.category.label("risk_category"),
+    func.coalesce(RiskScore.factors, func.json_object()).label("factors"),
+    RiskScore.model_version,
+    func.coalesce(RiskScore.confidence, 0.85).label("confidence"),
+    # Keyset position only; dropped before the rows are returned
+    RiskScore.created_at,
+    RiskScore.id
+)
+
+# Latest assessment for one complaint, built once so only the parameters vary
+_LATEST_RISK_SCORE = select(RiskScore).where(
+    RiskScore.complaint_id == bindparam("complaint_id"),
+    RiskScore.tenant_id == bindparam("tenant_id")
+).order_by(desc(RiskScore.created_at)).limit(1)
+
 
 @router.get("/", response_model=List[RiskAssessment])
 @trace_endpoint
 async def get_risk_assessments(
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     category: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get risk assessments for tenant"""
+    """Get risk assessments for tenant; pass X-Next-Cursor back as cursor for the next page"""
+    seek = seek_before(RiskScore, cursor)
     try:
-        query = select(RiskScore).where(
+        query = select(*_RISK_ASSESSMENT_COLUMNS).where(
             RiskScore.tenant_id == current_user.tenant_id
         )
         
         if category:
             query = query.where(RiskScore.category == category)
         
-        query = query.offset(skip).limit(limit).order_by(desc(RiskScore.created_at))
+        # Keyset pagination when a cursor is given, so deep pages cost the same
+        if seek is not None:
+            query = query.where(seek)
+        else:
+            query = query.offset(skip)
+        query = query.limit(limit).order_by(desc(RiskScore.created_at), desc(RiskScore.id))
         
         result = await db.execute(query)
-        risk_scores = result.scalars().all()
+        assessments = [dict(row) for row in result.mappings()]
         
-        return [
-            RiskAssessment(
-                complaint_id=rs.complaint_id,
-                risk_score=rs.risk,
-                risk_category=rs.category,
-                factors=rs.factors or {},
-                model_version=rs.model_version,
-                confidence=rs.confidence or 0.85
-            )
-            for rs in risk_scores
-        ]
+        next_cursor = None
+        if len(assessments) == limit:
+            next_cursor = encode_cursor(assessments[-1]["created_at"], assessments[-1]["id"])
+        for assessment in assessments:
+            del assessment["created_at"], assessment["id"]
+        
+        response = ORJSONResponse(assessments)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return response
         
     except Exception as e:
         logger.error(f"Error getting risk assessments: {e}")
@@ -69,31 +97,12 @@ async def get_risk_assessment(
 ):
     """Get risk assessment for specific complaint"""
     try:
-        # Verify complaint belongs to tenant
-        complaint_query = select(ComplaintRaw).where(
-            and_(
-                ComplaintRaw.id == complaint_id,
-                ComplaintRaw.tenant_id == current_user.tenant_id
-            )
+        # Get latest risk assessment; the tenant filter doubles as the
+        # ownership check, so a foreign complaint is simply not found
+        risk_result = await db.execute(
+            _LATEST_RISK_SCORE,
+            {"complaint_id": complaint_id, "tenant_id": current_user.tenant_id}
         )
-        complaint_result = await db.execute(complaint_query)
-        complaint = complaint_result.scalar_one_or_none()
-        
-        if not complaint:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Complaint not found"
-            )
-        
-        # Get latest risk assessment
-        risk_query = select(RiskScore).where(
-            and_(
-                RiskScore.complaint_id == complaint_id,
-                RiskScore.tenant_id == current_user.tenant_id
-            )
-        ).order_by(desc(RiskScore.created_at)).limit(1)
-        
-        risk_result = await db.execute(risk_query)
         risk_score = risk_result.scalar_one_or_none()
         
         if not risk_score:
@@ -102,7 +111,7 @@ async def get_risk_assessment(
                 detail="Risk assessment not found"
             )
         
-        return RiskAssessment(
+        return RiskAssessment.model_construct(
             complaint_id=risk_score.complaint_id,
             risk_score=risk_score.risk,
             risk_category=risk_score.category,
@@ -132,37 +141,45 @@ async def get_high_risk_alerts(
         # Get high-risk complaints from last 24 hours
         from datetime import datetime, timedelta
         
-        query = select(RiskScore, ComplaintRaw).join(
+        query = select(
+            RiskScore.complaint_id,
+            RiskScore.risk,
+            RiskScore.category,
+            RiskScore.factors,
+            RiskScore.created_at,
+            # Only the preview crosses the wire; one extra character tells
+            # whether the narrative was truncated
+            func.substring(ComplaintRaw.narrative, 1, 101).label("preview")
+        ).join(
             ComplaintRaw, RiskScore.complaint_id == ComplaintRaw.id
         ).where(
             and_(
                 RiskScore.tenant_id == current_user.tenant_id,
                 RiskScore.category == "high",
-                RiskScore.created_at >= datetime.now() - timedelta(hours=24)
+                RiskScore.created_at >= datetime.utcnow() - timedelta(hours=24)
             )
         ).order_by(desc(RiskScore.risk))
         
-        result = await db.execute(query)
-        high_risk_items = result.all()
+        result = await db.stream(query.execution_options(yield_per=500))
         
         alerts = []
-        for risk_score, complaint in high_risk_items:
+        async for item in result:
             alerts.append({
-                "complaint_id": complaint.id,
-                "narrative_preview": complaint.narrative[:100] + "..." if len(complaint.narrative) > 100 else complaint.narrative,
-                "risk_score": risk_score.risk,
-                "risk_category": risk_score.category,
-                "factors": risk_score.factors,
-                "created_at": risk_score.created_at.isoformat(),
-                "urgency": "immediate" if risk_score.risk >= 0.9 else "high"
+                "complaint_id": item.complaint_id,
+                "narrative_preview": item.preview[:100] + "..." if len(item.preview) > 100 else item.preview,
+                "risk_score": item.risk,
+                "risk_category": item.category,
+                "factors": item.factors,
+                "created_at": item.created_at.isoformat(),
+                "urgency": "immediate" if item.risk >= 0.9 else "high"
             })
         
-        return {
+        return ORJSONResponse({
             "alerts": alerts,
             "total_count": len(alerts),
             "critical_count": len([a for a in alerts if a["urgency"] == "immediate"]),
-            "generated_at": datetime.now().isoformat()
-        }
+            "generated_at": datetime.utcnow().isoformat()
+        })
         
     except Exception as e:
         logger.error(f"Error getting high-risk alerts: {e}")
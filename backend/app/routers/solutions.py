@@ -1,21 +1,163 @@
 """
 Solution and letter generation endpoints
 """
+import asyncio
+import html
 import logging
-from typing import List, Optional
+import orjson
+from typing import Dict, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, desc
+from sqlalchemy import select, desc, exists, bindparam, func
 
-from app.core.database import get_db
-from app.models.database import Solution, ComplaintRaw, User
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, get_db
+from app.core.redis import redis_client
+from app.core.pagination import encode_cursor, seek_before
+from app.models.database import Solution, ComplaintRaw, ComplaintLabel, RiskScore, User
 from app.models.schemas import SolutionCreate, SolutionResponse
 from app.services.auth import get_current_user
+from app.agents.stats_finder import stats_finder_agent
+from app.services.llm import llm_service
 from app.services.telemetry import trace_endpoint
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Tenant ownership check that projects no columns and builds no ORM object
+_COMPLAINT_EXISTS = select(exists().where(
+    ComplaintRaw.id == bindparam("complaint_id"),
+    ComplaintRaw.tenant_id == bindparam("tenant_id")
+))
+
+# Listing projection; no ORM rows are built, so nothing can lazy-load the
+# parent complaint per row
+_SOLUTION_COLUMNS = (
+    Solution.id,
+    Solution.complaint_id,
+    Solution.tenant_id,
+    Solution.solution_text,
+    Solution.resolution_strategy,
+    Solution.created_at
+)
+
+# Resolution letter page; generated text is HTML-escaped before it is
+# substituted in
+_LETTER_HTML = """
+            <html>
+            <head><title>Resolution Letter - Complaint #{complaint_id}</title></head>
+            <body>
+                <h1>Resolution Letter</h1>
+                <p><strong>Complaint ID:</strong> {complaint_id}</p>
+                <p><strong>Date:</strong> {date}</p>
+                <hr>
+                <div>{solution_text}</div>
+                <hr>
+                <p><strong>Resolution Strategy:</strong> {resolution_strategy}</p>
+            </body>
+            </html>
+            """
+
+# Latest solution for one complaint, built once so only the parameters vary
+_LATEST_SOLUTION = select(Solution).where(
+    Solution.complaint_id == bindparam("complaint_id"),
+    Solution.tenant_id == bindparam("tenant_id")
+).order_by(desc(Solution.created_at)).limit(1)
+
+# Inputs for a live solution draft: the complaint with its stored embedding
+# and latest label and risk score, as the workflow's solution step sees them
+_LATEST_LABEL_ID = select(func.max(ComplaintLabel.id)).where(
+    ComplaintLabel.complaint_id == ComplaintRaw.id
+).correlate(ComplaintRaw).scalar_subquery()
+_LATEST_RISK_ID = select(func.max(RiskScore.id)).where(
+    RiskScore.complaint_id == ComplaintRaw.id
+).correlate(ComplaintRaw).scalar_subquery()
+_DRAFT_CONTEXT = select(
+    ComplaintRaw.narrative,
+    ComplaintRaw.embedding,
+    ComplaintLabel.id.label("label_id"),
+    ComplaintLabel.product,
+    ComplaintLabel.issue,
+    ComplaintLabel.company,
+    RiskScore.id.label("risk_id"),
+    RiskScore.risk,
+    RiskScore.category,
+    RiskScore.factors
+).outerjoin(
+    ComplaintLabel, ComplaintLabel.id == _LATEST_LABEL_ID
+).outerjoin(
+    RiskScore, RiskScore.id == _LATEST_RISK_ID
+).where(
+    ComplaintRaw.id == bindparam("complaint_id"),
+    ComplaintRaw.tenant_id == bindparam("tenant_id")
+)
+
+# Draft generations in progress, by cache key; concurrent requests for the
+# same draft wait on the running task instead of starting another generation
+_draft_inflight: Dict[str, "asyncio.Task[str]"] = {}
+
+
+def _draft_event(text: str) -> bytes:
+    """One server-sent event carrying a JSON-encoded slice of the solution JSON text"""
+    return b"data: " + orjson.dumps(text) + b"\n\n"
+
+
+async def _generate_draft(
+    cache_key: str, complaint, tenant_id: str, deltas: "asyncio.Queue[Optional[str]]"
+) -> str:
+    """Produce one solution draft, from the cache or the model, feeding deltas to the queue
+
+    Runs as its own task so the draft is finished and cached even if the
+    requesting client goes away.
+    """
+    try:
+        cached = await redis_client.get(cache_key)
+    except Exception as e:
+        logger.warning(f"Solution draft cache lookup failed: {e}")
+        cached = None
+    if cached:
+        draft = cached.decode()
+        deltas.put_nowait(draft)
+        return draft
+    
+    async with AsyncSessionLocal() as session:
+        similar_cases = await stats_finder_agent.find_similar_cases(
+            complaint.narrative,
+            tenant_id,
+            session,
+            complaint.embedding.tolist() if complaint.embedding is not None else None
+        )
+    
+    parts = []
+    async for delta in llm_service.generate_solution_stream(
+        narrative=complaint.narrative,
+        entities={
+            "product": complaint.product,
+            "issue": complaint.issue,
+            "company": complaint.company
+        },
+        classification={
+            "product_category": complaint.product,
+            "issue_category": complaint.issue
+        },
+        similar_cases=similar_cases,
+        risk_assessment={
+            "risk_score": complaint.risk,
+            "risk_category": complaint.category or "medium",
+            "factors": complaint.factors or {}
+        }
+    ):
+        parts.append(delta)
+        deltas.put_nowait(delta)
+    
+    draft = "".join(parts)
+    try:
+        await redis_client.set(cache_key, draft, ex=settings.LLM_CACHE_TTL_SECONDS)
+    except Exception as e:
+        logger.warning(f"Solution draft cache store failed: {e}")
+    return draft
+
 
 @router.post("/", response_model=SolutionResponse)
 @trace_endpoint
@@ -27,16 +169,12 @@ async def create_solution(
     """Create a new solution for a complaint"""
     try:
         # Verify complaint exists and belongs to tenant
-        complaint_query = select(ComplaintRaw).where(
-            and_(
-                ComplaintRaw.id == solution.complaint_id,
-                ComplaintRaw.tenant_id == current_user.tenant_id
-            )
+        complaint_exists = await db.scalar(
+            _COMPLAINT_EXISTS,
+            {"complaint_id": solution.complaint_id, "tenant_id": current_user.tenant_id}
         )
-        complaint_result = await db.execute(complaint_query)
-        complaint = complaint_result.scalar_one_or_none()
         
-        if not complaint:
+        if not complaint_exists:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Complaint not found"
@@ -52,9 +190,8 @@ async def create_solution(
         
         db.add(db_solution)
         await db.commit()
-        await db.refresh(db_solution)
         
-        return SolutionResponse(
+        return SolutionResponse.model_construct(
             id=db_solution.id,
             complaint_id=db_solution.complaint_id,
             tenant_id=db_solution.tenant_id,
@@ -78,29 +215,33 @@ async def create_solution(
 async def get_solutions(
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get solutions for tenant"""
+    """Get solutions for tenant; pass X-Next-Cursor back as cursor for the next page"""
+    seek = seek_before(Solution, cursor)
     try:
-        query = select(Solution).where(
+        query = select(*_SOLUTION_COLUMNS).where(
             Solution.tenant_id == current_user.tenant_id
-        ).offset(skip).limit(limit).order_by(desc(Solution.created_at))
+        )
+        
+        # Keyset pagination when a cursor is given, so deep pages cost the same
+        if seek is not None:
+            query = query.where(seek)
+        else:
+            query = query.offset(skip)
+        query = query.limit(limit).order_by(desc(Solution.created_at), desc(Solution.id))
         
         result = await db.execute(query)
-        solutions = result.scalars().all()
-        
-        return [
-            SolutionResponse(
-                id=s.id,
-                complaint_id=s.complaint_id,
-                tenant_id=s.tenant_id,
-                solution_text=s.solution_text,
-                resolution_strategy=s.resolution_strategy,
-                created_at=s.created_at
+        solutions = [dict(row) for row in result.mappings()]
+        
+        response = ORJSONResponse(solutions)
+        if len(solutions) == limit:
+            response.headers["X-Next-Cursor"] = encode_cursor(
+                solutions[-1]["created_at"], solutions[-1]["id"]
             )
-            for s in solutions
-        ]
+        return response
         
     except Exception as e:
         logger.error(f"Error getting solutions: {e}")
@@ -119,31 +260,12 @@ async def get_solution_by_complaint(
 ):
     """Get solution for specific complaint"""
     try:
-        # Verify complaint belongs to tenant
-        complaint_query = select(ComplaintRaw).where(
-            and_(
-                ComplaintRaw.id == complaint_id,
-                ComplaintRaw.tenant_id == current_user.tenant_id
-            )
+        # Get latest solution; the tenant filter doubles as the ownership
+        # check, so a foreign complaint is simply not found
+        result = await db.execute(
+            _LATEST_SOLUTION,
+            {"complaint_id": complaint_id, "tenant_id": current_user.tenant_id}
         )
-        complaint_result = await db.execute(complaint_query)
-        complaint = complaint_result.scalar_one_or_none()
-        
-        if not complaint:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Complaint not found"
-            )
-        
-        # Get latest solution
-        solution_query = select(Solution).where(
-            and_(
-                Solution.complaint_id == complaint_id,
-                Solution.tenant_id == current_user.tenant_id
-            )
-        ).order_by(desc(Solution.created_at)).limit(1)
-        
-        result = await db.execute(solution_query)
         solution = result.scalar_one_or_none()
         
         if not solution:
@@ -152,7 +274,7 @@ async def get_solution_by_complaint(
                 detail="Solution not found"
             )
         
-        return SolutionResponse(
+        return SolutionResponse.model_construct(
             id=solution.id,
             complaint_id=solution.complaint_id,
             tenant_id=solution.tenant_id,
@@ -171,6 +293,85 @@ async def get_solution_by_complaint(
         )
 
 
+@router.get("/{complaint_id}/draft")
+@trace_endpoint
+async def stream_solution_draft(
+    complaint_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Stream a freshly generated solution as server-sent events"""
+    try:
+        result = await db.execute(
+            _DRAFT_CONTEXT,
+            {"complaint_id": complaint_id, "tenant_id": current_user.tenant_id}
+        )
+        complaint = result.one_or_none()
+        
+        if not complaint:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Complaint not found"
+            )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error loading draft context for complaint {complaint_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to generate solution"
+        )
+    
+    # A new label or risk score means a new draft
+    cache_key = f"solution_draft:{complaint_id}:{complaint.label_id}:{complaint.risk_id}"
+    inflight = _draft_inflight.get(cache_key)
+    
+    async def follower_events():
+        try:
+            draft = await asyncio.wait_for(
+                asyncio.shield(inflight), timeout=settings.SOLUTION_DRAFT_WAIT_SECONDS
+            )
+            yield _draft_event(draft)
+            yield b"event: done\ndata: {}\n\n"
+        except Exception as e:
+            logger.error(f"Error waiting for solution draft for complaint {complaint_id}: {e}")
+            yield b"event: error\ndata: {}\n\n"
+    
+    if inflight is not None:
+        return StreamingResponse(follower_events(), media_type="text/event-stream")
+    
+    # Registered before anything awaits, so a concurrent request always
+    # finds it; the task unregisters itself and ends the stream when done
+    deltas: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+    task = asyncio.create_task(
+        _generate_draft(cache_key, complaint, current_user.tenant_id, deltas)
+    )
+    _draft_inflight[cache_key] = task
+    
+    def finish(done: "asyncio.Task[str]") -> None:
+        if _draft_inflight.get(cache_key) is done:
+            del _draft_inflight[cache_key]
+        if not done.cancelled() and done.exception() is not None:
+            logger.error(f"Error streaming solution for complaint {complaint_id}: {done.exception()}")
+        deltas.put_nowait(None)
+    
+    task.add_done_callback(finish)
+    
+    async def events():
+        while True:
+            delta = await deltas.get()
+            if delta is None:
+                break
+            yield _draft_event(delta)
+        if task.cancelled() or task.exception() is not None:
+            yield b"event: error\ndata: {}\n\n"
+        else:
+            yield b"event: done\ndata: {}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 @router.get("/{complaint_id}/letter")
 @trace_endpoint
 async def get_solution_letter(
@@ -182,26 +383,18 @@ async def get_solution_letter(
     """Get formatted solution letter for complaint"""
     try:
         # Get solution
-        solution_query = select(Solution, ComplaintRaw).join(
-            ComplaintRaw, Solution.complaint_id == ComplaintRaw.id
-        ).where(
-            and_(
-                Solution.complaint_id == complaint_id,
-                Solution.tenant_id == current_user.tenant_id
-            )
-        ).order_by(desc(Solution.created_at)).limit(1)
-        
-        result = await db.execute(solution_query)
-        solution_data = result.first()
+        result = await db.execute(
+            _LATEST_SOLUTION,
+            {"complaint_id": complaint_id, "tenant_id": current_user.tenant_id}
+        )
+        solution = result.scalar_one_or_none()
         
-        if not solution_data:
+        if not solution:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Solution not found"
             )
         
-        solution, complaint = solution_data
-        
         # Format letter based on requested format
         if format == "pdf":
             # In production, generate PDF using reportlab or similar
@@ -211,20 +404,12 @@ async def get_solution_letter(
                 "message": "PDF generation would be implemented here"
             }
         elif format == "html":
-            html_content = f"""
-            <html>
-            <head><title>Resolution Letter - Complaint #{complaint_id}</title></head>
-            <body>
-                <h1>Resolution Letter</h1>
-                <p><strong>Complaint ID:</strong> {complaint_id}</p>
-                <p><strong>Date:</strong> {solution.created_at.strftime('%B %d, %Y')}</p>
-                <hr>
-                <div>{solution.solution_text}</div>
-                <hr>
-                <p><strong>Resolution Strategy:</strong> {solution.resolution_strategy}</p>
-            </body>
-            </html>
-            """
+            html_content = _LETTER_HTML.format(
+                complaint_id=complaint_id,
+                date=solution.created_at.strftime('%B %d, %Y'),
+                solution_text=html.escape(solution.solution_text),
+                resolution_strategy=html.escape(solution.resolution_strategy or "")
+            )
             return {
                 "format": "html",
                 "content": html_content
@@ -0,0 +1,111 @@
+"""
+Audit log service that batches writes off the request path
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.database import AuditLog
+
+logger = logging.getLogger(__name__)
+
+audit_queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(
+    maxsize=settings.AUDIT_LOG_QUEUE_SIZE
+)
+
+# Queued by stop_audit_log_writer; entries ahead of it are written before the writer exits
+_STOP: Dict[str, Any] = {}
+
+
+def record_audit(
+    tenant_id: str, user_id: Optional[str], action: str, payload: Dict[str, Any]
+) -> None:
+    """Queue an audit entry for the background writer"""
+    try:
+        audit_queue.put_nowait({
+            "tenant_id": tenant_id,
+            "user_id": user_id,
+            "action": action,
+            "payload": payload,
+            "created_at": datetime.utcnow(),
+        })
+    except asyncio.QueueFull:
+        logger.error(f"Audit queue full, dropping {action} entry for tenant {tenant_id}")
+
+
+def _drain(rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], bool]:
+    """Move queued entries into rows up to the batch size; True once the stop marker is taken"""
+    while len(rows) < settings.AUDIT_LOG_BATCH_SIZE and not audit_queue.empty():
+        entry = audit_queue.get_nowait()
+        if entry is _STOP:
+            return rows, True
+        rows.append(entry)
+    return rows, False
+
+
+async def _write_audit_rows(rows: List[Dict[str, Any]]) -> None:
+    """Insert a batch of audit entries as one multi-row INSERT"""
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(AuditLog), rows)
+        await db.commit()
+
+
+def _requeue(rows: List[Dict[str, Any]]) -> None:
+    """Put a batch that could not be written back on the queue for a later attempt"""
+    for i, row in enumerate(rows):
+        try:
+            audit_queue.put_nowait(row)
+        except asyncio.QueueFull:
+            logger.error(f"Audit queue full, dropping {len(rows) - i} unwritten audit log entries")
+            return
+
+
+async def _write_with_retry(rows: List[Dict[str, Any]]) -> bool:
+    """Write a batch, retrying transient failures with backoff; False if every attempt failed"""
+    for attempt in range(settings.AUDIT_LOG_WRITE_ATTEMPTS):
+        try:
+            await _write_audit_rows(rows)
+            return True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(
+                f"Error writing {len(rows)} audit log entries "
+                f"(attempt {attempt + 1}/{settings.AUDIT_LOG_WRITE_ATTEMPTS}): {e}"
+            )
+            if attempt + 1 < settings.AUDIT_LOG_WRITE_ATTEMPTS:
+                await asyncio.sleep(min(0.5 * 2 ** attempt, 10))
+    return False
+
+
+async def run_audit_log_writer() -> None:
+    """Flush queued audit entries in batches until stop_audit_log_writer is called"""
+    while True:
+        first = await audit_queue.get()
+        if first is _STOP:
+            return
+        rows, stopping = _drain([first])
+        if not await _write_with_retry(rows):
+            _requeue(rows)
+        if stopping:
+            return
+
+        await asyncio.sleep(settings.AUDIT_LOG_FLUSH_INTERVAL_MS / 1000)
+
+
+async def stop_audit_log_writer() -> None:
+    """Ask the writer to finish its current batch and exit; await its task afterwards"""
+    await audit_queue.put(_STOP)
+
+
+async def flush_audit_queue() -> None:
+    """Write whatever is still queued; called on shutdown after the writer has stopped"""
+    while not audit_queue.empty():
+        rows, _ = _drain([])
+        if rows and not await _write_with_retry(rows):
+            logger.error(f"Dropping {len(rows)} audit log entries that could not be written on shutdown")
+            return
@@ -0,0 +1,92 @@
+"""
+In-process ONNX classifier for the fixed complaint categories
+"""
+import logging
+import os
+from typing import Dict, Optional
+import numpy as np
+
+from app.core.config import settings
+
+try:
+    import onnxruntime as ort
+    from tokenizers import Tokenizer
+except ImportError:  # Optional; classification falls back to the LLM
+    ort = None
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_CATEGORIES = [
+    "credit_card", "loan", "mortgage", "deposit_account",
+    "money_transfer", "debt_collection", "credit_reporting", "other",
+]
+ISSUE_CATEGORIES = [
+    "unauthorized_charges", "billing_dispute", "service_quality", "account_access",
+    "fraud", "privacy", "discrimination", "other",
+]
+URGENCY_LEVELS = ["low", "medium", "high", "critical"]
+
+
+class ComplaintClassifier:
+    """Fine-tuned encoder exported to ONNX with product, issue and urgency heads"""
+    
+    def __init__(self, model_dir: str):
+        self.session = None
+        self.tokenizer = None
+        self.max_length = 256
+        self.min_confidence = settings.COMPLAINT_CLASSIFIER_MIN_CONFIDENCE
+        self.heads = [
+            ("product_category", PRODUCT_CATEGORIES),
+            ("issue_category", ISSUE_CATEGORIES),
+            ("urgency_level", URGENCY_LEVELS),
+        ]
+        if not model_dir:
+            return
+        if ort is None:
+            logger.info("onnxruntime not installed, complaint classification stays on the LLM")
+            return
+        
+        try:
+            available = ort.get_available_providers()
+            providers = [
+                provider
+                for provider in ("CUDAExecutionProvider", "CPUExecutionProvider")
+                if provider in available
+            ]
+            self.session = ort.InferenceSession(
+                os.path.join(model_dir, "model.onnx"), providers=providers
+            )
+            self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+            self.tokenizer.enable_truncation(self.max_length)
+            logger.info(f"Complaint classifier loaded from {model_dir} on {providers[0]}")
+        except Exception as e:
+            logger.error(f"Error loading complaint classifier: {e}")
+            self.session = None
+    
+    @property
+    def available(self) -> bool:
+        return self.session is not None
+    
+    def classify(self, narrative: str) -> Optional[Dict[str, str]]:
+        """Classify one narrative; None when any head is below the confidence floor"""
+        encoding = self.tokenizer.encode(narrative)
+        inputs = {
+            "input_ids": np.asarray([encoding.ids], dtype=np.int64),
+            "attention_mask": np.asarray([encoding.attention_mask], dtype=np.int64),
+        }
+        # One logits output per head, in self.heads order
+        outputs = self.session.run(None, inputs)
+        
+        classification = {}
+        for (name, labels), logits in zip(self.heads, outputs):
+            logits = logits[0] - np.max(logits[0])
+            probabilities = np.exp(logits) / np.sum(np.exp(logits))
+            best = int(np.argmax(probabilities))
+            if probabilities[best] < self.min_confidence:
+                return None
+            classification[name] = labels[best]
+        return classification
+
+
+# Global instance
+complaint_classifier = ComplaintClassifier(settings.COMPLAINT_CLASSIFIER_DIR)
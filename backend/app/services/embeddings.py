@@ -1,22 +1,80 @@
 """
 Embedding service for vector operations
 """
+import asyncio
 import logging
-import json
-from typing import List, Optional, Dict, Any
-import openai
-from openai import AsyncOpenAI
+import threading
+from typing import List, Optional, Dict, Any, Tuple
 import numpy as np
+import orjson
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
 
-from app.core.config import settings
+from app.core.database import AsyncSessionLocal
 from app.models.database import ComplaintRaw
+from app.services.llm import client
+
+try:
+    import faiss
+except ImportError:  # FAISS is optional; similarity search falls back to SQL
+    faiss = None
 
 logger = logging.getLogger(__name__)
 
-# Initialize OpenAI client
-client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+
+def _vector_text(embedding) -> str:
+    """Encode an embedding as the '[x,y,...]' text form TiDB VECTOR columns accept"""
+    return orjson.dumps(embedding, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+
+def _parse_vectors(embeddings: List[str]) -> np.ndarray:
+    """Decode a partition of stored vector text into a float32 matrix"""
+    return np.asarray([orjson.loads(embedding) for embedding in embeddings], dtype=np.float32)
+
+
+def _add_locked(index, lock: threading.Lock, complaint_ids: List[int], complaint_id: int, vector) -> None:
+    """Append one vector and its id together, so searches never see a position without an id"""
+    with lock:
+        index.add(vector)
+        complaint_ids.append(complaint_id)
+
+
+def _search_locked(index, lock: threading.Lock, query_vector, limit: int):
+    """Search a tenant index while no add() can run against it"""
+    with lock:
+        return index.search(query_vector, limit)
+
+
+# Hot-path statement built once so SQLAlchemy's compiled cache reuses it
+_UPDATE_EMBEDDING_SQL = text("""
+    UPDATE complaints_raw 
+    SET embedding = :embedding 
+    WHERE id = :complaint_id
+""")
+
+_NEAREST_COMPLAINTS_SQL = text("""
+    SELECT 
+        c.id,
+        c.narrative,
+        c.product,
+        c.issue,
+        c.company,
+        c.created_at,
+        r.risk,
+        r.category as risk_category,
+        nearest.distance
+    FROM (
+        SELECT id, VEC_COSINE_DISTANCE(embedding, :query_embedding) as distance
+        FROM complaints_raw
+        WHERE tenant_id = :tenant_id
+        AND embedding IS NOT NULL
+        ORDER BY distance
+        LIMIT :limit
+    ) nearest
+    JOIN complaints_raw c ON c.id = nearest.id
+    LEFT JOIN risk_scores r ON c.id = r.complaint_id
+    ORDER BY nearest.distance
+""")
 
 
 class EmbeddingService:
@@ -25,6 +83,17 @@ class EmbeddingService:
     def __init__(self):
         self.model = "text-embedding-ada-002"
         self.dimension = 1536
+        # Inputs per embeddings request; the API accepts up to 2048
+        self.max_batch_size = 1024
+        # Rows written per UPDATE statement when storing a batch
+        self.update_chunk_size = 200
+        # Tenants with at least this many embeddings are served from a FAISS index
+        self.faiss_min_vectors = 100_000
+        # Rows per server-side cursor fetch while loading an index
+        self.index_load_batch_size = 2000
+        # tenant -> (index, complaint ids by position, lock); FAISS does not
+        # allow add() concurrently with search(), so both hold the lock
+        self._faiss_indices: Dict[str, Tuple[Any, List[int], threading.Lock]] = {}
     
     async def create_embedding(self, text: str) -> List[float]:
         """Create embedding for given text"""
@@ -38,74 +107,268 @@ class EmbeddingService:
             logger.error(f"Error creating embedding: {e}")
             raise
     
+    async def create_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Create embeddings for many texts, one request per max_batch_size inputs"""
+        try:
+            batches = [
+                texts[start:start + self.max_batch_size]
+                for start in range(0, len(texts), self.max_batch_size)
+            ]
+            responses = await asyncio.gather(*(
+                client.embeddings.create(model=self.model, input=batch)
+                for batch in batches
+            ))
+            return [
+                item.embedding
+                for response in responses
+                for item in sorted(response.data, key=lambda item: item.index)
+            ]
+        except Exception as e:
+            logger.error(f"Error creating {len(texts)} embeddings: {e}")
+            raise
+    
+    async def store_complaint_embeddings(
+        self,
+        db: AsyncSession,
+        complaints: List[Tuple[int, str]]
+    ) -> List[List[float]]:
+        """Embed and store many complaints with batched embeddings calls and UPDATEs"""
+        if not complaints:
+            return []
+        try:
+            embeddings = await self.create_embeddings([narrative for _, narrative in complaints])
+            
+            # UPDATE ... CASE writes a chunk of rows per round trip; chunks keep
+            # each statement (~30 KB of JSON per vector) well under max_allowed_packet
+            rows = list(zip((complaint_id for complaint_id, _ in complaints), embeddings))
+            for start in range(0, len(rows), self.update_chunk_size):
+                chunk = rows[start:start + self.update_chunk_size]
+                whens = " ".join(
+                    f"WHEN :id_{i} THEN :embedding_{i}" for i in range(len(chunk))
+                )
+                params: Dict[str, Any] = {"complaint_ids": [complaint_id for complaint_id, _ in chunk]}
+                for i, (complaint_id, embedding) in enumerate(chunk):
+                    params[f"id_{i}"] = complaint_id
+                    params[f"embedding_{i}"] = _vector_text(embedding)
+                
+                query = text(f"""
+                    UPDATE complaints_raw
+                    SET embedding = CASE id {whens} END
+                    WHERE id IN :complaint_ids
+                """).bindparams(bindparam("complaint_ids", expanding=True))
+                await db.execute(query, params)
+            await db.commit()
+            
+            for (complaint_id, _), embedding in zip(complaints, embeddings):
+                await self._add_to_tenant_index(db, complaint_id, embedding)
+            return embeddings
+            
+        except Exception as e:
+            logger.error(f"Error storing {len(complaints)} embeddings: {e}")
+            raise
+    
     async def store_complaint_embedding(
         self, 
         db: AsyncSession, 
         complaint_id: int, 
         text: str
-    ) -> None:
-        """Store complaint embedding in database"""
+    ) -> List[float]:
+        """Store complaint embedding in database and return it for reuse"""
         try:
             embedding = await self.create_embedding(text)
-            embedding_json = json.dumps(embedding)
+            embedding_json = _vector_text(embedding)
             
             # Update complaint with embedding
-            query = text("""
-                UPDATE complaints_raw 
-                SET embedding = :embedding 
-                WHERE id = :complaint_id
-            """)
-            await db.execute(query, {
+            await db.execute(_UPDATE_EMBEDDING_SQL, {
                 "embedding": embedding_json,
                 "complaint_id": complaint_id
             })
             await db.commit()
             
+            await self._add_to_tenant_index(db, complaint_id, embedding)
+            return embedding
+            
         except Exception as e:
             logger.error(f"Error storing embedding: {e}")
             raise
     
+    async def load_vector_indices(self) -> None:
+        """Build FAISS indices for tenants large enough to benefit from them"""
+        if faiss is None:
+            logger.info("FAISS not installed, using SQL similarity search")
+            return
+        
+        try:
+            async with AsyncSessionLocal() as db:
+                tenants_query = text("""
+                    SELECT tenant_id
+                    FROM complaints_raw
+                    WHERE embedding IS NOT NULL
+                    GROUP BY tenant_id
+                    HAVING COUNT(*) >= :min_vectors
+                """)
+                result = await db.execute(tenants_query, {
+                    "min_vectors": self.faiss_min_vectors
+                })
+                tenant_ids = [row.tenant_id for row in result]
+                
+                for tenant_id in tenant_ids:
+                    await self._build_tenant_index(db, tenant_id)
+        
+        except Exception as e:
+            logger.error(f"Error loading vector indices: {e}")
+    
+    async def _build_tenant_index(self, db: AsyncSession, tenant_id: str) -> None:
+        """Load a tenant's embeddings into an inner-product index, on GPU if available"""
+        query = text("""
+            SELECT id, embedding
+            FROM complaints_raw
+            WHERE tenant_id = :tenant_id
+            AND embedding IS NOT NULL
+        """)
+        # Stream from a server-side cursor and convert each partition to
+        # float32 as it arrives, so the vector text of the whole tenant is
+        # never held at once
+        result = await db.stream(
+            query.execution_options(yield_per=self.index_load_batch_size),
+            {"tenant_id": tenant_id}
+        )
+        complaint_ids: List[int] = []
+        chunks: List[np.ndarray] = []
+        async for partition in result.partitions():
+            complaint_ids.extend(row.id for row in partition)
+            chunks.append(await asyncio.to_thread(
+                _parse_vectors, [row.embedding for row in partition]
+            ))
+        if not chunks:
+            return
+        
+        # Normalizing and indexing ~100k+ vectors is CPU-bound; keep it off the event loop
+        index = await asyncio.to_thread(self._new_index, chunks)
+        
+        self._faiss_indices[tenant_id] = (index, complaint_ids, threading.Lock())
+        logger.info(f"Built vector index for tenant {tenant_id} with {len(complaint_ids)} complaints")
+    
+    def _new_index(self, chunks: List[np.ndarray]):
+        """Build an inner-product index over normalized vectors, on GPU if available"""
+        vectors = np.concatenate(chunks)
+        chunks.clear()
+        faiss.normalize_L2(vectors)
+        
+        index = faiss.IndexFlatIP(self.dimension)
+        if faiss.get_num_gpus() > 0:
+            index = faiss.index_cpu_to_gpu(faiss.StandardGpuResources(), 0, index)
+        index.add(vectors)
+        return index
+    
+    async def _add_to_tenant_index(
+        self, db: AsyncSession, complaint_id: int, embedding: List[float]
+    ) -> None:
+        """Keep an already-built tenant index in sync with a newly stored embedding"""
+        if not self._faiss_indices:
+            return
+        
+        result = await db.execute(
+            text("SELECT tenant_id FROM complaints_raw WHERE id = :complaint_id"),
+            {"complaint_id": complaint_id}
+        )
+        tenant_id = result.scalar()
+        if tenant_id not in self._faiss_indices:
+            return
+        
+        index, complaint_ids, lock = self._faiss_indices[tenant_id]
+        vector = np.asarray([embedding], dtype=np.float32)
+        faiss.normalize_L2(vector)
+        await asyncio.to_thread(_add_locked, index, lock, complaint_ids, complaint_id, vector)
+    
+    async def _search_tenant_index(
+        self,
+        db: AsyncSession,
+        tenant_id: str,
+        query_embedding: List[float],
+        limit: int,
+        similarity_threshold: float
+    ) -> List[Dict[str, Any]]:
+        """Find similar complaints through the tenant's FAISS index"""
+        index, complaint_ids, lock = self._faiss_indices[tenant_id]
+        query_vector = np.asarray([query_embedding], dtype=np.float32)
+        faiss.normalize_L2(query_vector)
+        
+        scores, positions = await asyncio.to_thread(_search_locked, index, lock, query_vector, limit)
+        similarity_by_id = {
+            complaint_ids[position]: float(score)
+            for score, position in zip(scores[0], positions[0])
+            if position >= 0 and score >= similarity_threshold
+        }
+        if not similarity_by_id:
+            return []
+        
+        query = text("""
+            SELECT 
+                c.id,
+                c.narrative,
+                c.product,
+                c.issue,
+                c.company,
+                c.created_at,
+                r.risk,
+                r.category as risk_category
+            FROM complaints_raw c
+            LEFT JOIN risk_scores r ON c.id = r.complaint_id
+            WHERE c.id IN :complaint_ids
+        """).bindparams(bindparam("complaint_ids", expanding=True))
+        result = await db.execute(query, {"complaint_ids": list(similarity_by_id)})
+        
+        complaints = [
+            {
+                "id": row.id,
+                "narrative": row.narrative,
+                "product": row.product,
+                "issue": row.issue,
+                "company": row.company,
+                "created_at": row.created_at,
+                "risk_score": row.risk,
+                "risk_category": row.risk_category,
+                "similarity_score": similarity_by_id[row.id]
+            }
+            for row in result
+        ]
+        complaints.sort(key=lambda c: c["similarity_score"], reverse=True)
+        return complaints
+    
     async def find_similar_complaints(
         self,
         db: AsyncSession,
         query_text: str,
         tenant_id: str,
         limit: int = 10,
-        similarity_threshold: float = 0.7
+        similarity_threshold: float = 0.7,
+        query_embedding: Optional[List[float]] = None
     ) -> List[Dict[str, Any]]:
         """Find similar complaints using vector similarity"""
         try:
-            # Create embedding for query
-            query_embedding = await self.create_embedding(query_text)
-            query_embedding_json = json.dumps(query_embedding)
-            
-            # Vector similarity search using cosine similarity
-            # Note: This is a simplified version. In production, you'd use TiDB's vector functions
-            query = text("""
-                SELECT 
-                    c.id,
-                    c.narrative,
-                    c.product,
-                    c.issue,
-                    c.company,
-                    c.created_at,
-                    r.risk,
-                    r.category as risk_category
-                FROM complaints_raw c
-                LEFT JOIN risk_scores r ON c.id = r.complaint_id
-                WHERE c.tenant_id = :tenant_id 
-                AND c.embedding IS NOT NULL
-                ORDER BY c.created_at DESC
-                LIMIT :limit
-            """)
+            # Create embedding for query unless the caller already has one
+            if query_embedding is None:
+                query_embedding = await self.create_embedding(query_text)
             
-            result = await db.execute(query, {
+            # Large tenants are served from their FAISS index
+            if tenant_id in self._faiss_indices:
+                return await self._search_tenant_index(
+                    db, tenant_id, query_embedding, limit, similarity_threshold
+                )
+            # Nearest neighbours by cosine distance, served by the HNSW vector
+            # index on complaints_raw.embedding
+            result = await db.execute(_NEAREST_COMPLAINTS_SQL, {
                 "tenant_id": tenant_id,
+                "query_embedding": _vector_text(query_embedding),
                 "limit": limit
             })
             
             complaints = []
             for row in result:
+                similarity_score = 1.0 - float(row.distance)
+                if similarity_score < similarity_threshold:
+                    continue
                 complaints.append({
                     "id": row.id,
                     "narrative": row.narrative,
@@ -115,7 +378,7 @@ class EmbeddingService:
                     "created_at": row.created_at,
                     "risk_score": row.risk,
                     "risk_category": row.risk_category,
-                    "similarity_score": 0.85  # Placeholder - would calculate actual similarity
+                    "similarity_score": similarity_score
                 })
             
             return complaints
@@ -0,0 +1,75 @@
+"""
+Short-lived Redis cache for per-user historical risk features
+"""
+import logging
+import orjson
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.core.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def _user_key(tenant_id: str, user_id: Optional[str]) -> str:
+    """One hash per tenant user, one field per company, so a new complaint drops them all with DEL"""
+    return f"histfeat:{tenant_id}:{user_id or '-'}"
+
+
+def _company_key(tenant_id: str, company: str) -> str:
+    """Set of the user hashes holding a field for a company, since its counts span users"""
+    return f"histfeat-company:{tenant_id}:{company}"
+
+
+async def get_cached_features(
+    tenant_id: str, user_id: Optional[str], company: str
+) -> Optional[Dict[str, float]]:
+    """Return cached historical features for a user/company pair, if any"""
+    try:
+        cached = await redis_client.hget(_user_key(tenant_id, user_id), str(company))
+        return orjson.loads(cached) if cached else None
+    except Exception as e:
+        logger.warning(f"Historical feature cache lookup failed: {e}")
+        return None
+
+
+async def store_cached_features(
+    tenant_id: str, user_id: Optional[str], company: str, features: Dict[str, float]
+) -> None:
+    """Cache historical features; the user hash expires a fixed time after its first entry"""
+    user_key = _user_key(tenant_id, user_id)
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.hset(user_key, str(company), orjson.dumps(features))
+            pipe.expire(user_key, settings.HISTORICAL_FEATURES_CACHE_TTL_SECONDS, nx=True)
+            # Re-armed on every store so the set outlives each hash it names
+            pipe.sadd(_company_key(tenant_id, str(company)), user_key)
+            pipe.expire(
+                _company_key(tenant_id, str(company)),
+                settings.HISTORICAL_FEATURES_CACHE_TTL_SECONDS
+            )
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Historical feature cache store failed: {e}")
+
+
+async def invalidate_user_features(
+    tenant_id: str, user_id: Optional[str], company: Optional[str]
+) -> None:
+    """Drop cached features a new complaint makes stale
+
+    That is all of the filing user's entries, and every user's entry for the
+    company, whose count includes complaints from other users.
+    """
+    try:
+        company_key = _company_key(tenant_id, str(company))
+        holders = await redis_client.smembers(company_key) if company else set()
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.delete(_user_key(tenant_id, user_id))
+            if company:
+                for user_key in holders:
+                    pipe.hdel(user_key, str(company))
+                pipe.delete(company_key)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Historical feature cache invalidation failed: {e}")
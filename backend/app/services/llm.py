@@ -1,17 +1,298 @@
 """
 LLM service for AI operations
 """
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Any, List, Optional
-from openai import AsyncOpenAI
-import json
+import time
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
+import httpx
+import tiktoken
+from openai import APIConnectionError, APITimeoutError, AsyncOpenAI, RateLimitError
+from opentelemetry import trace
+from tenacity import (
+    AsyncRetrying,
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+import orjson
 
 from app.core.config import settings
+from app.core.redis import redis_client
+from app.models.schemas import NarrativeAnalysis
+from app.services.complaint_classifier import (
+    ISSUE_CATEGORIES,
+    PRODUCT_CATEGORIES,
+    URGENCY_LEVELS,
+    complaint_classifier,
+)
 
 logger = logging.getLogger(__name__)
 
-# Initialize OpenAI client
-client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+# Bump to invalidate cached completions after changing any prompt
+_PROMPT_VERSION = "v1"
+
+# Shared OpenAI client; one keep-alive connection pool for every agent and
+# the embedding service
+client = AsyncOpenAI(
+    api_key=settings.OPENAI_API_KEY,
+    http_client=httpx.AsyncClient(
+        # HTTP/2 multiplexes concurrent requests over a few TLS connections
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=settings.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OPENAI_MAX_CONNECTIONS,
+            keepalive_expiry=90,
+        ),
+        timeout=httpx.Timeout(60.0, connect=5.0),
+    ),
+)
+
+# Optional self-hosted OpenAI-compatible server (e.g. vLLM) for the cheap
+# narrative analyses; solution generation always stays on the hosted model
+local_client = (
+    AsyncOpenAI(
+        api_key=settings.LOCAL_LLM_API_KEY,
+        base_url=settings.LOCAL_LLM_URL,
+        http_client=httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+            timeout=httpx.Timeout(30.0),
+        ),
+    )
+    if settings.LOCAL_LLM_URL
+    else None
+)
+
+
+# Static instructions go in a byte-identical system message ahead of the
+# per-complaint content, so the provider's prefix cache can reuse them
+_ENTITY_SYSTEM_PROMPT = """
+Extract the following entities from the complaint narrative in the user message:
+- product: The financial product (credit card, loan, mortgage, etc.)
+- issue: The main issue type (unauthorized charges, billing dispute, etc.)
+- company: The company name mentioned
+- amount: Any monetary amount mentioned
+- date: Any dates mentioned
+
+Return as JSON with keys: product, issue, company, amount, date
+If any entity is not found, use null.
+"""
+
+_BUNDLE_SYSTEM_PROMPT = """
+Analyze the complaint narrative in the user message and return all of the following at once.
+
+entities: JSON object with keys product, issue, company, amount, date
+(the financial product, main issue type, company name, any monetary
+amount and any dates mentioned; use null when not found)
+
+sentiment: JSON object with keys
+- sentiment: positive, negative, neutral
+- emotion: angry, frustrated, disappointed, confused, other
+- urgency_indicators: list of phrases indicating urgency
+- escalation_risk: low, medium, high
+
+classification: JSON object with keys product_category, issue_category, urgency_level
+- product_category: credit_card, loan, mortgage, deposit_account, money_transfer, debt_collection, credit_reporting, other
+- issue_category: unauthorized_charges, billing_dispute, service_quality, account_access, fraud, privacy, discrimination, other
+- urgency_level: low, medium, high, critical
+
+Return as JSON with keys: entities, sentiment, classification
+"""
+
+_JSON_OBJECT_FORMAT = {"type": "json_object"}
+
+_BUNDLE_RESPONSE_FORMAT = (
+    {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "narrative_analysis",
+            "schema": NarrativeAnalysis.model_json_schema(),
+            "strict": True,
+        },
+    }
+    if settings.LLM_STRUCTURED_OUTPUTS
+    else _JSON_OBJECT_FORMAT
+)
+
+_CLASSIFY_SYSTEM_PROMPT = """
+Classify the complaint in the user message into the following categories:
+
+Product Categories:
+- credit_card, loan, mortgage, deposit_account, money_transfer, debt_collection, credit_reporting, other
+
+Issue Categories:
+- unauthorized_charges, billing_dispute, service_quality, account_access, fraud, privacy, discrimination, other
+
+Urgency Levels:
+- low, medium, high, critical
+
+Return as JSON with keys: product_category, issue_category, urgency_level
+"""
+
+_CLASSIFY_BATCH_SYSTEM_PROMPT = """
+Classify each of the numbered complaints in the user message into the following categories:
+
+Product Categories:
+- credit_card, loan, mortgage, deposit_account, money_transfer, debt_collection, credit_reporting, other
+
+Issue Categories:
+- unauthorized_charges, billing_dispute, service_quality, account_access, fraud, privacy, discrimination, other
+
+Urgency Levels:
+- low, medium, high, critical
+
+Return as JSON with key results: a list with one object per complaint, in
+input order, each with keys product_category, issue_category, urgency_level
+"""
+
+_SENTIMENT_SYSTEM_PROMPT = """
+Analyze the sentiment and emotional tone of the complaint in the user message.
+
+Provide:
+- sentiment: positive, negative, neutral
+- emotion: angry, frustrated, disappointed, confused, other
+- urgency_indicators: list of phrases indicating urgency
+- escalation_risk: low, medium, high
+
+Return as JSON.
+"""
+
+_SOLUTION_SYSTEM_PROMPT = """
+Generate a professional resolution strategy and response letter for the complaint in the user message.
+
+Provide:
+1. resolution_strategy: Brief strategy description
+2. response_letter: Professional response letter
+3. next_steps: List of recommended actions
+4. estimated_resolution_time: Time estimate in hours
+
+Return as JSON with these keys.
+"""
+
+
+class _TokenBucket:
+    """Async token bucket refilled continuously at a per-minute rate"""
+    
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.refill_per_second = self.capacity / 60
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self, amount: float) -> None:
+        """Wait until `amount` tokens are available and spend them; waiters are served in order"""
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.updated_at) * self.refill_per_second
+                )
+                self.updated_at = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.refill_per_second)
+
+
+class OpenAIRequestPool:
+    """Concurrency, requests-per-minute and tokens-per-minute limits for chat completions"""
+    
+    def __init__(self, num_concurrent: int, requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        self._semaphore = asyncio.Semaphore(num_concurrent)
+        # A zero limit leaves that dimension unthrottled
+        self._request_bucket = _TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._token_bucket = _TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._encoding = None
+    
+    def _estimate_tokens(self, request: Dict[str, Any]) -> int:
+        """Prompt tokens plus the completion allowance, as the provider counts them against TPM"""
+        text = "".join(message["content"] for message in request.get("messages", []))
+        try:
+            if self._encoding is None:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+            prompt_tokens = len(self._encoding.encode(text))
+        except Exception:
+            prompt_tokens = len(text) // 4
+        return prompt_tokens + (request.get("max_tokens") or settings.OPENAI_COMPLETION_TOKEN_ESTIMATE)
+    
+    async def _wait_for_budget(self, request: Dict[str, Any]) -> None:
+        """Spend the request's share of the per-minute budgets"""
+        if self._request_bucket:
+            await self._request_bucket.acquire(1)
+        if self._token_bucket:
+            estimated_tokens = self._estimate_tokens(request)
+            await self._token_bucket.acquire(estimated_tokens)
+            trace.get_current_span().set_attribute("openai.estimated_tokens", estimated_tokens)
+    
+    async def submit(self, api_client: AsyncOpenAI, **request):
+        """Create a chat completion once the rate budgets and a concurrency slot allow it"""
+        started = time.perf_counter()
+        await self._wait_for_budget(request)
+        
+        async with self._semaphore:
+            trace.get_current_span().set_attribute(
+                "openai.queue_wait", time.perf_counter() - started
+            )
+            return await api_client.chat.completions.create(**request)
+    
+    async def stream(self, api_client: AsyncOpenAI, **request) -> AsyncIterator[str]:
+        """Stream a chat completion's text, holding the concurrency slot until it is consumed"""
+        started = time.perf_counter()
+        await self._wait_for_budget(request)
+        
+        async with self._semaphore:
+            trace.get_current_span().set_attribute(
+                "openai.queue_wait", time.perf_counter() - started
+            )
+            stream = await api_client.chat.completions.create(stream=True, **request)
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                await stream.response.aclose()
+
+
+# Hosted requests are paced to the account's rate limits; the self-hosted
+# server only needs its concurrency bounded
+_hosted_request_pool = OpenAIRequestPool(
+    settings.OPENAI_MAX_CONCURRENCY,
+    settings.OPENAI_MAX_REQUESTS_PER_MINUTE,
+    settings.OPENAI_MAX_TOKENS_PER_MINUTE,
+)
+_local_request_pool = OpenAIRequestPool(settings.OPENAI_MAX_CONCURRENCY)
+
+
+@retry(
+    retry=retry_if_exception_type(RateLimitError),
+    wait=wait_exponential_jitter(initial=1, max=30),
+    stop=stop_after_attempt(6),
+    reraise=True,
+)
+async def _create_chat_completion(api_client: AsyncOpenAI, **kwargs):
+    """Create a chat completion through the client's request pool, retrying rate limits"""
+    pool = _hosted_request_pool if api_client is client else _local_request_pool
+    return await pool.submit(api_client, **kwargs)
+
+
+# Failures worth another attempt at a streamed completion, including a
+# connection dropped part-way through the stream
+_STREAM_RETRY_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, httpx.TransportError)
+_STREAM_ATTEMPTS = 4
+
+
+def _is_valid_classification(classification: Dict[str, Any]) -> bool:
+    """Whether every category is one the prompt allows"""
+    return (
+        classification.get("product_category") in PRODUCT_CATEGORIES
+        and classification.get("issue_category") in ISSUE_CATEGORIES
+        and classification.get("urgency_level") in URGENCY_LEVELS
+    )
 
 
 class LLMService:
@@ -20,71 +301,285 @@ class LLMService:
     def __init__(self):
         self.model = "gpt-4-turbo-preview"
         self.temperature = 0.1
+        self.cache_ttl = settings.LLM_CACHE_TTL_SECONDS
+        # Entity, sentiment and classification prompts
+        self.analysis_client = local_client or client
+        self.analysis_model = (
+            settings.LOCAL_LLM_MODEL if local_client else settings.OPENAI_ANALYSIS_MODEL
+        )
+        # Complaints per request in classify_complaints_batch
+        self.classification_batch_size = 10
+        # Completions in progress by cache key, so concurrent identical
+        # prompts share one request instead of each missing the cache
+        self._inflight: Dict[str, "asyncio.Future[Tuple[Dict[str, Any], bool]]"] = {}
+    
+    async def warm_up(self) -> None:
+        """Open a pooled connection to the API so the first complaint skips the handshake"""
+        try:
+            await client.models.list()
+        except Exception as e:
+            logger.warning(f"LLM connection warm-up failed: {e}")
+    
+    async def _complete_json_cached(
+        self,
+        system_prompt: str,
+        user_content: str,
+        response_format: Dict[str, Any] = _JSON_OBJECT_FORMAT,
+        escalate: bool = False
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Run a narrative-analysis JSON completion, serving identical prompts from the cache
+
+        Uses the cheap analysis model; escalate=True, or a reply that is not
+        valid JSON, sends the prompt to the full model instead.
+        """
+        api_client, model = (client, self.model) if escalate else (self.analysis_client, self.analysis_model)
+        digest = hashlib.sha256(
+            f"{self.temperature}|{system_prompt}|{user_content}".encode()
+        ).hexdigest()
+        cache_key = f"llm:{model}:{_PROMPT_VERSION}:{digest}"
+        
+        try:
+            cached = await redis_client.get(cache_key)
+            if cached:
+                return orjson.loads(cached), True
+        except Exception as e:
+            logger.warning(f"LLM cache lookup failed: {e}")
+        
+        # A cancelled leader leaves the key free; the next follower takes it
+        # over and the rest wait on that one instead
+        inflight = self._inflight.get(cache_key)
+        while inflight is not None:
+            try:
+                result, _ = await asyncio.shield(inflight)
+                # Own copy, since callers may modify what they get back
+                return orjson.loads(orjson.dumps(result)), True
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+            inflight = self._inflight.get(cache_key)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = future
+        try:
+            completion = await self._complete_json(
+                api_client, model, cache_key, system_prompt, user_content, response_format, escalate
+            )
+            future.set_result(completion)
+            return completion
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a failure nobody else awaited is not logged twice
+            future.exception()
+            raise
+        finally:
+            if self._inflight.get(cache_key) is future:
+                del self._inflight[cache_key]
+    
+    async def _complete_json(
+        self,
+        api_client: AsyncOpenAI,
+        model: str,
+        cache_key: str,
+        system_prompt: str,
+        user_content: str,
+        response_format: Dict[str, Any],
+        escalate: bool
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Request a JSON completion and cache it, escalating unparseable replies"""
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content}
+        ]
+        response = await _create_chat_completion(
+            api_client,
+            model=model,
+            messages=messages,
+            temperature=self.temperature,
+            # Strict schemas are only sent to the analysis model
+            response_format=_JSON_OBJECT_FORMAT if escalate else response_format
+        )
+        content = response.choices[0].message.content
+        
+        try:
+            result = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            if escalate:
+                raise
+            logger.warning(f"{model} returned invalid JSON, escalating to {self.model}")
+            return await self._complete_json_cached(system_prompt, user_content, escalate=True)
+        
+        try:
+            await redis_client.set(cache_key, content, ex=self.cache_ttl)
+        except Exception as e:
+            logger.warning(f"LLM cache store failed: {e}")
+        
+        return result, False
     
     async def extract_entities(self, narrative: str) -> Dict[str, Any]:
         """Extract entities from complaint narrative"""
         try:
-            prompt = f"""
-            Extract the following entities from this complaint narrative:
-            - product: The financial product (credit card, loan, mortgage, etc.)
-            - issue: The main issue type (unauthorized charges, billing dispute, etc.)
-            - company: The company name mentioned
-            - amount: Any monetary amount mentioned
-            - date: Any dates mentioned
-            
-            Narrative: {narrative}
-            
-            Return as JSON with keys: product, issue, company, amount, date
-            If any entity is not found, use null.
-            """
-            
-            response = await client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=self.temperature,
-                response_format={"type": "json_object"}
+            result, _ = await self._complete_json_cached(
+                _ENTITY_SYSTEM_PROMPT, f"Narrative: {narrative}"
             )
-            
-            return json.loads(response.choices[0].message.content)
+            return result
             
         except Exception as e:
             logger.error(f"Error extracting entities: {e}")
             return {}
     
+    async def analyze_complaint_bundle(self, narrative: str) -> Dict[str, Any]:
+        """Extract entities, sentiment and classification in a single request"""
+        try:
+            bundle, cache_hit = await self._complete_json_cached(
+                _BUNDLE_SYSTEM_PROMPT, f"Narrative: {narrative}", _BUNDLE_RESPONSE_FORMAT
+            )
+            return {
+                "entities": bundle.get("entities") or {},
+                "sentiment": bundle.get("sentiment") or {},
+                "classification": bundle.get("classification") or {},
+                "cache_hit": cache_hit,
+            }
+            
+        except Exception as e:
+            logger.error(f"Error analyzing complaint bundle, falling back to separate prompts: {e}")
+            return await self.analyze(narrative)
+    
+    async def analyze(self, narrative: str) -> Dict[str, Any]:
+        """Run the separate analysis prompts, overlapping the two that are independent"""
+        entities, sentiment = await asyncio.gather(
+            self.extract_entities(narrative),
+            self.analyze_sentiment(narrative)
+        )
+        # Classification is conditioned on the extracted entities
+        classification = await self.classify_complaint(narrative, entities)
+        return {
+            "entities": entities,
+            "sentiment": sentiment,
+            "classification": classification,
+            "cache_hit": False,
+        }
+    
     async def classify_complaint(self, narrative: str, entities: Dict[str, Any]) -> Dict[str, str]:
         """Classify complaint into categories"""
         try:
-            prompt = f"""
-            Classify this complaint into the following categories:
-            
-            Product Categories:
-            - credit_card, loan, mortgage, deposit_account, money_transfer, debt_collection, credit_reporting, other
-            
-            Issue Categories:
-            - unauthorized_charges, billing_dispute, service_quality, account_access, fraud, privacy, discrimination, other
+            # Confident in-process predictions skip the LLM round trip
+            if complaint_classifier.available:
+                classification = await asyncio.to_thread(complaint_classifier.classify, narrative)
+                if classification:
+                    return classification
             
-            Urgency Levels:
-            - low, medium, high, critical
-            
-            Narrative: {narrative}
-            Entities: {json.dumps(entities)}
-            
-            Return as JSON with keys: product_category, issue_category, urgency_level
-            """
-            
-            response = await client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=self.temperature,
-                response_format={"type": "json_object"}
-            )
-            
-            return json.loads(response.choices[0].message.content)
+            user_content = f"Narrative: {narrative}\nEntities: {orjson.dumps(entities).decode()}"
+            result, _ = await self._complete_json_cached(_CLASSIFY_SYSTEM_PROMPT, user_content)
+            if not _is_valid_classification(result):
+                logger.warning(f"{self.analysis_model} returned unknown categories, escalating to {self.model}")
+                result, _ = await self._complete_json_cached(
+                    _CLASSIFY_SYSTEM_PROMPT, user_content, escalate=True
+                )
+            return result
             
         except Exception as e:
             logger.error(f"Error classifying complaint: {e}")
             return {}
     
+    async def classify_complaints_batch(self, narratives: List[str]) -> List[Dict[str, str]]:
+        """Classify many complaints, several per request, returning results in input order"""
+        batches = [
+            narratives[start:start + self.classification_batch_size]
+            for start in range(0, len(narratives), self.classification_batch_size)
+        ]
+        results = await asyncio.gather(*(self._classify_batch(batch) for batch in batches))
+        return [classification for batch in results for classification in batch]
+    
+    async def _classify_batch(self, narratives: List[str]) -> List[Dict[str, str]]:
+        """Classify one batch in a single request, falling back to per-complaint requests"""
+        try:
+            numbered = "\n\n".join(
+                f"{i}. {narrative}" for i, narrative in enumerate(narratives, 1)
+            )
+            result, _ = await self._complete_json_cached(_CLASSIFY_BATCH_SYSTEM_PROMPT, numbered)
+            classifications = result.get("results") or []
+            if len(classifications) == len(narratives):
+                return classifications
+            logger.warning(
+                f"Batch classification returned {len(classifications)} results for {len(narratives)} complaints"
+            )
+        except Exception as e:
+            logger.error(f"Error classifying complaint batch: {e}")
+        
+        return list(await asyncio.gather(*(
+            self.classify_complaint(narrative, {}) for narrative in narratives
+        )))
+    
+    def _solution_messages(
+        self,
+        narrative: str,
+        entities: Dict[str, Any],
+        classification: Dict[str, str],
+        similar_cases: List[Dict[str, Any]],
+        risk_assessment: Dict[str, Any]
+    ) -> List[Dict[str, str]]:
+        """Build the solution prompt messages"""
+        # Prepare context from similar cases
+        similar_context = ""
+        if similar_cases:
+            similar_context = "Similar successful resolutions:\n" + "".join(
+                f"- {case.get('resolution_strategy', 'N/A')}\n"
+                for case in similar_cases[:3]  # Top 3 similar cases
+            )
+        
+        user_content = (
+            f"Complaint: {narrative}\n"
+            f"Entities: {orjson.dumps(entities).decode()}\n"
+            f"Classification: {orjson.dumps(classification).decode()}\n"
+            f"Risk Level: {risk_assessment.get('risk_category', 'medium')}\n"
+            f"{similar_context}"
+        )
+        return [
+            {"role": "system", "content": _SOLUTION_SYSTEM_PROMPT},
+            {"role": "user", "content": user_content}
+        ]
+    
+    async def generate_solution_stream(
+        self,
+        narrative: str,
+        entities: Dict[str, Any],
+        classification: Dict[str, str],
+        similar_cases: List[Dict[str, Any]],
+        risk_assessment: Dict[str, Any]
+    ) -> AsyncIterator[str]:
+        """Stream the solution JSON text as the model produces it
+
+        Failures before the first delta are retried; once text has been
+        yielded the caller owns recovery, since it has already seen output.
+        """
+        messages = self._solution_messages(
+            narrative, entities, classification, similar_cases, risk_assessment
+        )
+        for attempt in range(_STREAM_ATTEMPTS):
+            started_output = False
+            try:
+                async for delta in self._stream_solution_once(messages):
+                    started_output = True
+                    yield delta
+                return
+            except _STREAM_RETRY_ERRORS:
+                if started_output or attempt + 1 == _STREAM_ATTEMPTS:
+                    raise
+                await asyncio.sleep(min(2 ** attempt, 30))
+    
+    def _stream_solution_once(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """One solution stream request, without retries"""
+        return _hosted_request_pool.stream(
+            client,
+            model=self.model,
+            messages=messages,
+            temperature=self.temperature,
+            response_format={"type": "json_object"}
+        )
+    
     async def generate_solution(
         self, 
         narrative: str, 
@@ -95,40 +590,20 @@ class LLMService:
     ) -> Dict[str, Any]:
         """Generate solution and response letter"""
         try:
-            # Prepare context from similar cases
-            similar_context = ""
-            if similar_cases:
-                similar_context = "Similar successful resolutions:\n"
-                for case in similar_cases[:3]:  # Top 3 similar cases
-                    similar_context += f"- {case.get('resolution_strategy', 'N/A')}\n"
-            
-            prompt = f"""
-            Generate a professional resolution strategy and response letter for this complaint:
-            
-            Complaint: {narrative}
-            Entities: {json.dumps(entities)}
-            Classification: {json.dumps(classification)}
-            Risk Level: {risk_assessment.get('risk_category', 'medium')}
-            
-            {similar_context}
-            
-            Provide:
-            1. resolution_strategy: Brief strategy description
-            2. response_letter: Professional response letter
-            3. next_steps: List of recommended actions
-            4. estimated_resolution_time: Time estimate in hours
-            
-            Return as JSON with these keys.
-            """
-            
-            response = await client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=self.temperature,
-                response_format={"type": "json_object"}
+            messages = self._solution_messages(
+                narrative, entities, classification, similar_cases, risk_assessment
             )
-            
-            return json.loads(response.choices[0].message.content)
+            # Retried here only, whether the stream fails before or after its
+            # first delta, since a partial reply is simply thrown away
+            async for attempt in AsyncRetrying(
+                retry=retry_if_exception_type(_STREAM_RETRY_ERRORS),
+                wait=wait_exponential_jitter(initial=1, max=30),
+                stop=stop_after_attempt(_STREAM_ATTEMPTS),
+                reraise=True,
+            ):
+                with attempt:
+                    parts = [delta async for delta in self._stream_solution_once(messages)]
+            return orjson.loads("".join(parts))
             
         except Exception as e:
             logger.error(f"Error generating solution: {e}")
@@ -137,28 +612,10 @@ class LLMService:
     async def analyze_sentiment(self, text: str) -> Dict[str, Any]:
         """Analyze sentiment of complaint text"""
         try:
-            prompt = f"""
-            Analyze the sentiment and emotional tone of this complaint:
-            
-            Text: {text}
-            
-            Provide:
-            - sentiment: positive, negative, neutral
-            - emotion: angry, frustrated, disappointed, confused, other
-            - urgency_indicators: list of phrases indicating urgency
-            - escalation_risk: low, medium, high
-            
-            Return as JSON.
-            """
-            
-            response = await client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=self.temperature,
-                response_format={"type": "json_object"}
+            result, _ = await self._complete_json_cached(
+                _SENTIMENT_SYSTEM_PROMPT, f"Text: {text}"
             )
-            
-            return json.loads(response.choices[0].message.content)
+            return result
             
         except Exception as e:
             logger.error(f"Error analyzing sentiment: {e}")
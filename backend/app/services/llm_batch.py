@@ -0,0 +1,98 @@
+"""
+OpenAI Batch API path for offline and bulk complaint analysis
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import bindparam, update
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.database import BulkJob
+from app.services.llm import _BUNDLE_SYSTEM_PROMPT, client, llm_service
+
+logger = logging.getLogger(__name__)
+
+_BATCH_ENDPOINT = "/v1/chat/completions"
+_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+_UPDATE_BULK_JOB = update(BulkJob).where(
+    BulkJob.id == bindparam("batch_id")
+).values(
+    status=bindparam("status"),
+    output_file_id=bindparam("output_file_id")
+).execution_options(synchronize_session=False)
+
+
+def _batch_line(custom_id: str, narrative: str) -> bytes:
+    """One JSONL request line running the bundled analysis prompt"""
+    return orjson.dumps({
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": _BATCH_ENDPOINT,
+        "body": {
+            "model": settings.OPENAI_ANALYSIS_MODEL,
+            "temperature": llm_service.temperature,
+            "response_format": {"type": "json_object"},
+            "messages": [
+                {"role": "system", "content": _BUNDLE_SYSTEM_PROMPT},
+                {"role": "user", "content": f"Narrative: {narrative}"},
+            ],
+        },
+    })
+
+
+async def submit_batch(rows: List[Tuple[str, str]]) -> str:
+    """Submit (custom_id, narrative) rows as one Batch API job and record it"""
+    payload = b"\n".join(_batch_line(custom_id, narrative) for custom_id, narrative in rows)
+    input_file = await client.files.create(
+        file=("complaints.jsonl", payload), purpose="batch"
+    )
+    batch = await client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=_BATCH_ENDPOINT,
+        completion_window="24h",
+    )
+    
+    async with AsyncSessionLocal() as db:
+        db.add(BulkJob(id=batch.id, status=batch.status, request_count=len(rows)))
+        await db.commit()
+    
+    logger.info(f"Submitted batch {batch.id} with {len(rows)} complaints")
+    return batch.id
+
+
+async def collect_batch(batch_id: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Wait for a batch to finish and return its analyses keyed by custom_id"""
+    while True:
+        batch = await client.batches.retrieve(batch_id)
+        if batch.status in _TERMINAL_STATUSES:
+            break
+        await asyncio.sleep(settings.OPENAI_BATCH_POLL_SECONDS)
+    
+    async with AsyncSessionLocal() as db:
+        await db.execute(_UPDATE_BULK_JOB, {
+            "batch_id": batch_id,
+            "status": batch.status,
+            "output_file_id": batch.output_file_id,
+        })
+        await db.commit()
+    
+    if batch.status != "completed" or not batch.output_file_id:
+        logger.error(f"Batch {batch_id} finished with status {batch.status}")
+        return None
+    
+    output = await client.files.content(batch.output_file_id)
+    results: Dict[str, Dict[str, Any]] = {}
+    for line in output.content.splitlines():
+        if not line:
+            continue
+        item = orjson.loads(line)
+        try:
+            content = item["response"]["body"]["choices"][0]["message"]["content"]
+            results[item["custom_id"]] = orjson.loads(content)
+        except (KeyError, IndexError, TypeError, orjson.JSONDecodeError) as e:
+            logger.error(f"Unusable batch result for {item.get('custom_id')}: {e}")
+    return results
@@ -3,24 +3,44 @@ Risk assessment model using XGBoost
 """
 import logging
 import json
+import os
 import pickle
+import threading
 from typing import Dict, Any, List, Optional
 import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 import xgboost as xgb
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 
+from app.core.config import settings
+from app.services.feature_cache import get_cached_features, store_cached_features
+
 logger = logging.getLogger(__name__)
 
+# Past-year complaints by this user or about this company, read from the
+# user_company_stats rollup: user total + company total - the pair's own
+# count, so complaints by this user about this company are counted once
+_HISTORICAL_FEATURES = text("""
+    SELECT
+        SUM(CASE WHEN user_id <> '' AND company <> '' THEN -complaint_count
+                 ELSE complaint_count END) as complaint_count,
+        DATEDIFF(UTC_TIMESTAMP(), MAX(last_complaint_at)) as days_since
+    FROM user_company_stats
+    WHERE tenant_id = :tenant_id
+    AND (user_id, company) IN ((:user_id, ''), ('', :company), (:user_id, :company))
+""")
+
 
 class RiskModel:
     """XGBoost-based risk assessment model"""
     
     def __init__(self):
         self.model = None
+        self.booster = None
+        self._booster_lock = threading.Lock()
         self.label_encoders = {}
         self.scaler = StandardScaler()
         self.feature_columns = [
@@ -28,14 +48,21 @@ class RiskModel:
             'narrative_length', 'amount_mentioned', 'urgency_score',
             'sentiment_score', 'historical_complaints', 'days_since_last_complaint'
         ]
+        # Packed float32 record per complaint; rows view directly as the booster's input matrix
+        self.feature_dtype = np.dtype([(col, np.float32) for col in self.feature_columns])
         self.model_version = "1.0.0"
         self._initialize_model()
     
     def _initialize_model(self):
         """Initialize or load the XGBoost model"""
         try:
-            # In production, load from file
-            # For now, create a simple model
+            # Trained booster, scored in place on a reused float32 row buffer
+            if settings.RISK_MODEL_PATH and os.path.exists(settings.RISK_MODEL_PATH):
+                self.booster = xgb.Booster()
+                self.booster.load_model(settings.RISK_MODEL_PATH)
+                logger.info(f"Risk booster loaded from {settings.RISK_MODEL_PATH}")
+            self._feature_buffer = np.empty((1, len(self.feature_columns)), dtype=np.float32)
+            
             self.model = xgb.XGBClassifier(
                 n_estimators=100,
                 max_depth=6,
@@ -59,6 +86,13 @@ class RiskModel:
             self.label_encoders['issue'].fit(dummy_issues)
             self.label_encoders['company'].fit(dummy_companies)
             
+            # Plain dict lookups for per-complaint encoding; unseen values map to 'other'
+            self.cat_maps = {
+                name: {c: i for i, c in enumerate(encoder.classes_)}
+                for name, encoder in self.label_encoders.items()
+            }
+            self.cat_unknown = {name: m['other'] for name, m in self.cat_maps.items()}
+            
             logger.info("Risk model initialized")
             
         except Exception as e:
@@ -84,21 +118,9 @@ class RiskModel:
             issue = classification.get('issue_category', 'other')
             company = entities.get('company', 'other')
             
-            # Handle unknown categories
-            try:
-                features['product_encoded'] = self.label_encoders['product'].transform([product])[0]
-            except ValueError:
-                features['product_encoded'] = self.label_encoders['product'].transform(['other'])[0]
-            
-            try:
-                features['issue_encoded'] = self.label_encoders['issue'].transform([issue])[0]
-            except ValueError:
-                features['issue_encoded'] = self.label_encoders['issue'].transform(['other'])[0]
-            
-            try:
-                features['company_encoded'] = self.label_encoders['company'].transform([company])[0]
-            except ValueError:
-                features['company_encoded'] = self.label_encoders['company'].transform(['other'])[0]
+            features['product_encoded'] = self.cat_maps['product'].get(product, self.cat_unknown['product'])
+            features['issue_encoded'] = self.cat_maps['issue'].get(issue, self.cat_unknown['issue'])
+            features['company_encoded'] = self.cat_maps['company'].get(company, self.cat_unknown['company'])
             
             # Text features
             features['narrative_length'] = len(narrative)
@@ -130,36 +152,26 @@ class RiskModel:
     ) -> Dict[str, float]:
         """Get historical features for risk assessment"""
         try:
-            # Count historical complaints for this user/company
-            query = text("""
-                SELECT 
-                    COUNT(*) as complaint_count,
-                    MAX(created_at) as last_complaint_date,
-                    AVG(r.risk) as avg_risk
-                FROM complaints_raw c
-                LEFT JOIN risk_scores r ON c.id = r.complaint_id
-                WHERE c.tenant_id = :tenant_id
-                AND (c.user_id = :user_id OR c.company = :company)
-                AND c.created_at >= DATE_SUB(NOW(), INTERVAL 1 YEAR)
-            """)
+            cached = await get_cached_features(tenant_id, user_id, company)
+            if cached:
+                return cached
             
-            result = await db.execute(query, {
+            result = await db.execute(_HISTORICAL_FEATURES, {
                 "tenant_id": tenant_id,
-                "user_id": user_id,
-                "company": company
+                "user_id": user_id or "",
+                "company": company or ""
             })
             
             row = result.fetchone()
             
             features = {
                 'historical_complaints': float(row.complaint_count if row.complaint_count else 0),
-                'days_since_last_complaint': 365.0  # Default
+                'days_since_last_complaint': (
+                    float(row.days_since) if row.days_since is not None else 365.0
+                )
             }
             
-            if row.last_complaint_date:
-                days_diff = (datetime.now() - row.last_complaint_date).days
-                features['days_since_last_complaint'] = float(days_diff)
-            
+            await store_cached_features(tenant_id, user_id, company, features)
             return features
             
         except Exception as e:
@@ -186,11 +198,11 @@ class RiskModel:
             if not features:
                 return self._default_risk_assessment()
             
-            # Create feature vector
-            feature_vector = np.array([[features.get(col, 0.0) for col in self.feature_columns]])
-            
-            # For now, use a simple rule-based approach since we don't have training data
-            risk_score = self._calculate_rule_based_risk(features, sentiment, classification)
+            if self.booster is not None:
+                risk_score = self._predict_booster(features)
+            else:
+                # Rule-based fallback until a trained booster is configured
+                risk_score = self._calculate_rule_based_risk(features, sentiment, classification)
             
             # Determine risk category
             if risk_score >= 0.7:
@@ -215,6 +227,13 @@ class RiskModel:
             logger.error(f"Error predicting risk: {e}")
             return self._default_risk_assessment()
     
+    def _predict_booster(self, features: Dict[str, float]) -> float:
+        """Score one feature dict with the booster, without a DMatrix copy"""
+        with self._booster_lock:
+            for i, col in enumerate(self.feature_columns):
+                self._feature_buffer[0, i] = features.get(col, 0.0)
+            return float(self.booster.inplace_predict(self._feature_buffer)[0])
+    
     def _calculate_rule_based_risk(
         self,
         features: Dict[str, float],
@@ -249,6 +268,77 @@ class RiskModel:
         
         return min(risk_score, 1.0)
     
+    def _feature_matrix(self, df: pd.DataFrame) -> np.ndarray:
+        """Pack the frame's feature columns into a float32 (rows, features) matrix"""
+        rows = np.zeros(len(df), dtype=self.feature_dtype)
+        for col in self.feature_columns:
+            if col in df:
+                rows[col] = df[col].fillna(0.0).to_numpy(dtype=np.float32)
+        return rows.view(np.float32).reshape(len(df), len(self.feature_columns))
+    
+    def predict_risk_batch(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Score a frame of already-extracted features in one vectorized pass
+
+        Expects columns urgency_level, sentiment, emotion, issue_category,
+        historical_complaints, amount_mentioned and days_since_last_complaint,
+        plus the remaining feature_columns when a booster is loaded; applies
+        the same rules as _calculate_rule_based_risk and _explain_risk_factors.
+        """
+        urgency = df['urgency_level'].fillna('medium')
+        high_urgency = urgency.isin(['high', 'critical']).to_numpy()
+        negative = (df['sentiment'] == 'negative').to_numpy()
+        angry = (df['emotion'] == 'angry').to_numpy()
+        high_risk_issue = df['issue_category'].isin(
+            ['unauthorized_charges', 'fraud', 'discrimination']
+        ).to_numpy()
+        historical = df['historical_complaints'].fillna(0).to_numpy(dtype=float)
+        amount_mentioned = df['amount_mentioned'].fillna(0).to_numpy(dtype=float) > 0
+        no_recent = df['days_since_last_complaint'].fillna(0).to_numpy(dtype=float) > 180
+        
+        if self.booster is not None:
+            risk_scores = self.booster.inplace_predict(self._feature_matrix(df)).astype(float)
+        else:
+            urgency_weights = {'low': 0.0, 'medium': 0.1, 'high': 0.2, 'critical': 0.3}
+            risk_scores = (
+                0.3
+                + urgency.map(urgency_weights).fillna(0.1).to_numpy(dtype=float)
+                + np.where(negative, 0.2, 0.0)
+                + np.where(angry, 0.15, 0.0)
+                + np.where(high_risk_issue, 0.2, 0.0)
+                + np.where(historical > 2, 0.1, 0.0)
+                + np.where(amount_mentioned, 0.1, 0.0)
+            )
+            risk_scores = np.minimum(risk_scores, 1.0)
+        risk_categories = np.array(["low", "medium", "high"])[
+            np.digitize(risk_scores, [0.4, 0.7])
+        ]
+        
+        # Only assembling the per-row factor lists is left to Python
+        factors = [
+            {
+                "primary_factors": (
+                    (["High urgency complaint"] if urgent else [])
+                    + (["Negative sentiment detected"] if neg else [])
+                ),
+                "contributing_factors": (
+                    (["Multiple previous complaints"] if repeat else [])
+                    + (["Financial amount mentioned"] if amount else [])
+                ),
+                "mitigating_factors": ["No recent complaints"] if quiet else [],
+            }
+            for urgent, neg, repeat, amount, quiet in zip(
+                high_urgency, negative, historical > 1, amount_mentioned, no_recent
+            )
+        ]
+        
+        return pd.DataFrame({
+            "risk_score": risk_scores,
+            "risk_category": risk_categories,
+            "confidence": 0.85,  # Placeholder, as in predict_risk
+            "factors": factors,
+            "model_version": self.model_version,
+        }, index=df.index)
+    
     def _explain_risk_factors(
         self,
         features: Dict[str, float],
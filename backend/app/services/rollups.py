@@ -0,0 +1,166 @@
+"""
+Rollup service for pre-aggregated OLAP benchmark data
+"""
+import asyncio
+import logging
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Recompute the daily rollup rows for the trailing window; feedback and
+# solutions arrive after the complaint, so older days are refreshed too
+_REFRESH_BENCHMARKS_SQL = text("""
+    INSERT INTO complaint_benchmarks_daily (
+        tenant_id, product, issue, day,
+        total_complaints, resolved_count, sum_resolution_hours,
+        rated_count, sum_rating, success_count,
+        high_risk_count, risk_count, sum_risk, refreshed_at
+    )
+    SELECT
+        c.tenant_id,
+        COALESCE(c.product, ''),
+        COALESCE(c.issue, ''),
+        DATE(c.created_at),
+        COUNT(*),
+        COUNT(s.id),
+        COALESCE(SUM(TIMESTAMPDIFF(HOUR, c.created_at, s.created_at)), 0),
+        COUNT(f.rating),
+        COALESCE(SUM(f.rating), 0),
+        COUNT(CASE WHEN f.rating >= 4 THEN 1 END),
+        COUNT(CASE WHEN r.category = 'high' THEN 1 END),
+        COUNT(r.risk),
+        COALESCE(SUM(r.risk), 0),
+        UTC_TIMESTAMP()
+    FROM complaints_raw c
+    LEFT JOIN solutions s ON c.id = s.complaint_id
+    LEFT JOIN feedback f ON c.id = f.complaint_id
+    LEFT JOIN risk_scores r ON c.id = r.complaint_id
+    WHERE c.created_at >= DATE_SUB(UTC_DATE(), INTERVAL :days DAY)
+    GROUP BY c.tenant_id, COALESCE(c.product, ''), COALESCE(c.issue, ''), DATE(c.created_at)
+    ON DUPLICATE KEY UPDATE
+        total_complaints = VALUES(total_complaints),
+        resolved_count = VALUES(resolved_count),
+        sum_resolution_hours = VALUES(sum_resolution_hours),
+        rated_count = VALUES(rated_count),
+        sum_rating = VALUES(sum_rating),
+        success_count = VALUES(success_count),
+        high_risk_count = VALUES(high_risk_count),
+        risk_count = VALUES(risk_count),
+        sum_risk = VALUES(sum_risk),
+        refreshed_at = VALUES(refreshed_at)
+""")
+
+
+# Re-derive the trailing-year history rows from complaints_raw, dropping
+# users and companies with nothing left in the window
+_TRIM_USER_COMPANY_STATS_SQL = text("""
+    DELETE FROM user_company_stats
+    WHERE last_complaint_at < DATE_SUB(UTC_TIMESTAMP(), INTERVAL 1 YEAR)
+""")
+
+_REFRESH_USER_COMPANY_STATS_SQL = text("""
+    INSERT INTO user_company_stats (
+        tenant_id, user_id, company, complaint_count, last_complaint_at
+    )
+    SELECT * FROM (
+        SELECT tenant_id, user_id, '', COUNT(*), MAX(created_at)
+        FROM complaints_raw
+        WHERE created_at >= DATE_SUB(UTC_TIMESTAMP(), INTERVAL 1 YEAR)
+        AND user_id IS NOT NULL
+        GROUP BY tenant_id, user_id
+        UNION ALL
+        SELECT tenant_id, '', company, COUNT(*), MAX(created_at)
+        FROM complaints_raw
+        WHERE created_at >= DATE_SUB(UTC_TIMESTAMP(), INTERVAL 1 YEAR)
+        AND company IS NOT NULL AND company <> ''
+        GROUP BY tenant_id, company
+        UNION ALL
+        SELECT tenant_id, user_id, company, COUNT(*), MAX(created_at)
+        FROM complaints_raw
+        WHERE created_at >= DATE_SUB(UTC_TIMESTAMP(), INTERVAL 1 YEAR)
+        AND user_id IS NOT NULL
+        AND company IS NOT NULL AND company <> ''
+        GROUP BY tenant_id, user_id, company
+    ) history
+    ON DUPLICATE KEY UPDATE
+        complaint_count = VALUES(complaint_count),
+        last_complaint_at = VALUES(last_complaint_at)
+""")
+
+_INCREMENT_USER_COMPANY_STATS_SQL = text("""
+    INSERT INTO user_company_stats (
+        tenant_id, user_id, company, complaint_count, last_complaint_at
+    )
+    VALUES (:tenant_id, :user_id, :company, 1, UTC_TIMESTAMP())
+    ON DUPLICATE KEY UPDATE
+        complaint_count = complaint_count + 1,
+        last_complaint_at = VALUES(last_complaint_at)
+""")
+
+
+async def record_user_company_complaint(
+    db: AsyncSession, tenant_id: str, user_id: Optional[str], company: Optional[str]
+) -> None:
+    """Count a new complaint in its user, company and pair history rows; the caller commits"""
+    keys = []
+    if user_id:
+        keys.append((user_id, ""))
+    if company:
+        keys.append(("", company))
+    if user_id and company:
+        keys.append((user_id, company))
+    if keys:
+        await db.execute(_INCREMENT_USER_COMPANY_STATS_SQL, [
+            {"tenant_id": tenant_id, "user_id": key_user, "company": key_company}
+            for key_user, key_company in keys
+        ])
+
+
+async def refresh_user_company_stats(db: AsyncSession) -> None:
+    """Rebuild user_company_stats from the last year of complaints"""
+    await db.execute(_TRIM_USER_COMPANY_STATS_SQL)
+    await db.execute(_REFRESH_USER_COMPANY_STATS_SQL)
+    await db.commit()
+
+
+async def refresh_complaint_benchmarks(db: AsyncSession, days: int) -> None:
+    """Rebuild complaint_benchmarks_daily rows for the last `days` days"""
+    await db.execute(_REFRESH_BENCHMARKS_SQL, {"days": days})
+    await db.commit()
+
+
+async def run_benchmark_rollup_refresher() -> None:
+    """Periodically refresh the benchmark rollup until cancelled"""
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                await refresh_complaint_benchmarks(
+                    db, settings.BENCHMARK_ROLLUP_WINDOW_DAYS
+                )
+            logger.info("Complaint benchmark rollup refreshed")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error refreshing complaint benchmark rollup: {e}")
+
+        await asyncio.sleep(settings.BENCHMARK_ROLLUP_REFRESH_SECONDS)
+
+
+async def run_user_company_stats_refresher() -> None:
+    """Periodically re-derive the user/company history counts until cancelled"""
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                await refresh_user_company_stats(db)
+            logger.info("User/company complaint history refreshed")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error refreshing user/company complaint history: {e}")
+
+        await asyncio.sleep(settings.USER_COMPANY_STATS_REFRESH_SECONDS)
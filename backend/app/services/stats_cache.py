@@ -0,0 +1,43 @@
+"""
+Read-through Redis cache for per-tenant dashboard statistics
+"""
+import logging
+from typing import Optional
+
+from app.core.config import settings
+from app.core.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def _tenant_key(tenant_id: str) -> str:
+    """One hash per tenant, one field per query, so a write drops them all with DEL"""
+    return f"stats:{tenant_id}"
+
+
+async def get_cached_stats(tenant_id: str, query_key: str) -> Optional[bytes]:
+    """Return the cached JSON body for a tenant stats query, if any"""
+    try:
+        return await redis_client.hget(_tenant_key(tenant_id), query_key)
+    except Exception as e:
+        logger.warning(f"Stats cache lookup failed: {e}")
+        return None
+
+
+async def store_cached_stats(tenant_id: str, query_key: str, body: bytes) -> None:
+    """Cache a stats JSON body; the tenant hash expires a fixed time after its first entry"""
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.hset(_tenant_key(tenant_id), query_key, body)
+            pipe.expire(_tenant_key(tenant_id), settings.STATS_CACHE_TTL_SECONDS, nx=True)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Stats cache store failed: {e}")
+
+
+async def invalidate_stats_cache(tenant_id: str) -> None:
+    """Drop every cached stats query for a tenant after a write that changes them"""
+    try:
+        await redis_client.delete(_tenant_key(tenant_id))
+    except Exception as e:
+        logger.warning(f"Stats cache invalidation failed: {e}")
@@ -5,10 +5,11 @@ import logging
 import time
 from functools import wraps
 from typing import Any, Callable
+from grpc import Compression
 from opentelemetry import trace
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.exporter.jaeger.thrift import JaegerExporter
+from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
 
@@ -26,14 +27,19 @@ def setup_telemetry():
         # Set up tracer provider
         trace.set_tracer_provider(TracerProvider())
         
-        # Configure Jaeger exporter
-        jaeger_exporter = JaegerExporter(
-            agent_host_name="localhost",
-            agent_port=6831,
+        # Protobuf over gRPC, gzip-compressed; no UDP size limit on span batches
+        otlp_exporter = OTLPSpanExporter(
+            endpoint=settings.OTLP_ENDPOINT,
+            compression=Compression.Gzip,
         )
         
-        # Add span processor
-        span_processor = BatchSpanProcessor(jaeger_exporter)
+        # Add span processor; larger, less frequent batches mean fewer export calls
+        span_processor = BatchSpanProcessor(
+            otlp_exporter,
+            max_queue_size=8192,
+            schedule_delay_millis=2000,
+            max_export_batch_size=1024,
+        )
         trace.get_tracer_provider().add_span_processor(span_processor)
         
         # Instrument SQLAlchemy
@@ -45,46 +51,72 @@ def setup_telemetry():
         logger.warning(f"Failed to setup telemetry: {e}")
 
 
-def trace_endpoint(func: Callable) -> Callable:
-    """Decorator to trace endpoint execution"""
+def _trace_async(span_name: str, func: Callable) -> Callable:
+    """Wrap a coroutine function in a span; unsampled spans skip the bookkeeping"""
     @wraps(func)
     async def wrapper(*args, **kwargs):
-        with tracer.start_as_current_span(f"{func.__module__}.{func.__name__}") as span:
-            start_time = time.time()
+        with tracer.start_as_current_span(span_name) as span:
+            if not span.is_recording():
+                return await func(*args, **kwargs)
+            start_time = time.perf_counter()
             try:
                 result = await func(*args, **kwargs)
-                span.set_attribute("success", True)
-                return result
             except Exception as e:
-                span.set_attribute("success", False)
-                span.set_attribute("error", str(e))
+                span.set_attributes({
+                    "success": False,
+                    "error": str(e),
+                    "execution_time": time.perf_counter() - start_time,
+                })
                 raise
-            finally:
-                execution_time = time.time() - start_time
-                span.set_attribute("execution_time", execution_time)
+            span.set_attributes({
+                "success": True,
+                "execution_time": time.perf_counter() - start_time,
+            })
+            return result
     
     return wrapper
 
 
+def _trace_sync(span_name: str, func: Callable) -> Callable:
+    """Wrap a plain function in a span; unsampled spans skip the bookkeeping"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with tracer.start_as_current_span(span_name) as span:
+            if not span.is_recording():
+                return func(*args, **kwargs)
+            start_time = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                span.set_attributes({
+                    "success": False,
+                    "error": str(e),
+                    "execution_time": time.perf_counter() - start_time,
+                })
+                raise
+            span.set_attributes({
+                "success": True,
+                "execution_time": time.perf_counter() - start_time,
+            })
+            return result
+    
+    return wrapper
+
+
+def trace_endpoint(func: Callable) -> Callable:
+    """Decorator to trace endpoint execution"""
+    return _trace_async(f"{func.__module__}.{func.__name__}", func)
+
+
 def trace_function(operation_name: str = None):
-    """Decorator to trace function execution"""
+    """Decorator to trace coroutine function execution"""
     def decorator(func: Callable) -> Callable:
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            span_name = operation_name or f"{func.__module__}.{func.__name__}"
-            with tracer.start_as_current_span(span_name) as span:
-                start_time = time.time()
-                try:
-                    result = await func(*args, **kwargs)
-                    span.set_attribute("success", True)
-                    return result
-                except Exception as e:
-                    span.set_attribute("success", False)
-                    span.set_attribute("error", str(e))
-                    raise
-                finally:
-                    execution_time = time.time() - start_time
-                    span.set_attribute("execution_time", execution_time)
-        
-        return wrapper
-    return decorator
\ No newline at end of file
+        return _trace_async(operation_name or f"{func.__module__}.{func.__name__}", func)
+    return decorator
+
+
+def trace_function_sync(operation_name: str = None):
+    """Decorator to trace synchronous function execution"""
+    def decorator(func: Callable) -> Callable:
+        return _trace_sync(operation_name or f"{func.__module__}.{func.__name__}", func)
+    return decorator
@@ -0,0 +1,75 @@
+"""Convert complaints_raw.embedding from JSON text to VECTOR(1536) with an HNSW index
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-15
+
+Tables created by Base.metadata.create_all before the VECTOR column existed
+keep embedding as TEXT; create_all never alters them. TiDB cannot MODIFY a
+TEXT column into a VECTOR, so the vectors are copied into a new column in id
+ranges, each committed on its own so no transaction grows with the table,
+and that column then replaces the old one.
+Databases created after the change already have the column and only get the
+index if it is missing.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+_COPY_BATCH_ROWS = 10_000
+
+
+def _column_type(bind, table: str, column: str) -> str:
+    return bind.execute(sa.text("""
+        SELECT DATA_TYPE FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND COLUMN_NAME = :column
+    """), {"table": table, "column": column}).scalar() or ""
+
+
+def _has_index(bind, table: str, index: str) -> bool:
+    return bool(bind.execute(sa.text("""
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND INDEX_NAME = :index
+    """), {"table": table, "index": index}).scalar())
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    if _column_type(bind, "complaints_raw", "embedding").lower() != "vector":
+        op.execute("ALTER TABLE complaints_raw ADD COLUMN embedding_vector VECTOR(1536) NULL")
+        max_id = bind.execute(sa.text("SELECT COALESCE(MAX(id), 0) FROM complaints_raw")).scalar()
+        # Autocommit, so each range UPDATE is its own transaction
+        with op.get_context().autocommit_block():
+            for start in range(0, max_id + 1, _COPY_BATCH_ROWS):
+                op.get_bind().execute(sa.text("""
+                    UPDATE complaints_raw
+                    SET embedding_vector = VEC_FROM_TEXT(embedding)
+                    WHERE id >= :start AND id < :end AND embedding IS NOT NULL
+                """), {"start": start, "end": start + _COPY_BATCH_ROWS})
+        op.execute("ALTER TABLE complaints_raw DROP COLUMN embedding")
+        op.execute(
+            "ALTER TABLE complaints_raw RENAME COLUMN embedding_vector TO embedding"
+        )
+
+    if not _has_index(bind, "complaints_raw", "idx_complaints_embedding_cosine"):
+        # Vector indexes are served from TiFlash
+        op.execute("ALTER TABLE complaints_raw SET TIFLASH REPLICA 1")
+        op.execute("""
+            ALTER TABLE complaints_raw
+            ADD VECTOR INDEX idx_complaints_embedding_cosine ((VEC_COSINE_DISTANCE(embedding))) USING HNSW
+        """)
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE complaints_raw DROP INDEX idx_complaints_embedding_cosine")
+    op.execute("ALTER TABLE complaints_raw ADD COLUMN embedding_text TEXT NULL")
+    op.execute("UPDATE complaints_raw SET embedding_text = VEC_AS_TEXT(embedding) WHERE embedding IS NOT NULL")
+    op.execute("ALTER TABLE complaints_raw DROP COLUMN embedding")
+    op.execute("ALTER TABLE complaints_raw RENAME COLUMN embedding_text TO embedding")
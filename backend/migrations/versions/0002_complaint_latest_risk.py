@@ -0,0 +1,62 @@
+"""Add the denormalized latest risk columns to complaints_raw and backfill them
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-15
+
+Fills latest_risk / latest_risk_category from each complaint's newest
+risk_scores row, in id ranges that are each committed on their own so no
+transaction grows with the table.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+_BACKFILL_BATCH_ROWS = 10_000
+
+
+def _has_column(bind, table: str, column: str) -> bool:
+    return bool(bind.execute(sa.text("""
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND COLUMN_NAME = :column
+    """), {"table": table, "column": column}).scalar())
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    if not _has_column(bind, "complaints_raw", "latest_risk"):
+        op.add_column("complaints_raw", sa.Column("latest_risk", sa.Float(), nullable=True))
+        op.create_index("ix_complaints_raw_latest_risk", "complaints_raw", ["latest_risk"])
+    if not _has_column(bind, "complaints_raw", "latest_risk_category"):
+        op.add_column(
+            "complaints_raw", sa.Column("latest_risk_category", sa.String(16), nullable=True)
+        )
+
+    max_id = bind.execute(sa.text("SELECT COALESCE(MAX(id), 0) FROM complaints_raw")).scalar()
+    # Autocommit, so each range UPDATE is its own transaction
+    with op.get_context().autocommit_block():
+        for start in range(0, max_id + 1, _BACKFILL_BATCH_ROWS):
+            op.get_bind().execute(sa.text("""
+                UPDATE complaints_raw c
+                JOIN (
+                    SELECT complaint_id, MAX(id) as latest_id
+                    FROM risk_scores
+                    WHERE complaint_id >= :start AND complaint_id < :end
+                    GROUP BY complaint_id
+                ) latest ON latest.complaint_id = c.id
+                JOIN risk_scores r ON r.id = latest.latest_id
+                SET c.latest_risk = r.risk, c.latest_risk_category = r.category
+            """), {"start": start, "end": start + _BACKFILL_BATCH_ROWS})
+
+
+def downgrade() -> None:
+    op.drop_index("ix_complaints_raw_latest_risk", table_name="complaints_raw")
+    op.drop_column("complaints_raw", "latest_risk_category")
+    op.drop_column("complaints_raw", "latest_risk")
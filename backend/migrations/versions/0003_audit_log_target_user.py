@@ -0,0 +1,52 @@
+"""Add the indexed audit_logs.target_user_id generated column
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-15
+
+TiDB cannot ADD a STORED generated column to an existing table, so the
+column is VIRTUAL; its index is materialized, which is what the admin
+audit-log filter reads.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def _has_column(bind, table: str, column: str) -> bool:
+    return bool(bind.execute(sa.text("""
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND COLUMN_NAME = :column
+    """), {"table": table, "column": column}).scalar())
+
+
+def _has_index(bind, table: str, index: str) -> bool:
+    return bool(bind.execute(sa.text("""
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND INDEX_NAME = :index
+    """), {"table": table, "index": index}).scalar())
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    if not _has_column(bind, "audit_logs", "target_user_id"):
+        op.execute("""
+            ALTER TABLE audit_logs ADD COLUMN target_user_id VARCHAR(36)
+            GENERATED ALWAYS AS (
+                JSON_UNQUOTE(COALESCE(JSON_EXTRACT(payload, '$.user_id'), JSON_EXTRACT(payload, '$.created_user_id')))
+            ) VIRTUAL
+        """)
+    if not _has_index(bind, "audit_logs", "ix_audit_logs_target_user_id"):
+        op.create_index("ix_audit_logs_target_user_id", "audit_logs", ["target_user_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_audit_logs_target_user_id", table_name="audit_logs")
+    op.drop_column("audit_logs", "target_user_id")
@@ -0,0 +1,87 @@
+"""Create the listing and covering indexes declared on the models
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-15
+
+create_all only creates indexes with their tables, so databases from before
+the admin listing, tenant-scoped listing, keyset pagination and covering
+stats indexes never got them. The indexes those replace are dropped, since
+each is a prefix of, or reordered into, one created here.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+# (index, table, key columns)
+_INDEXES = [
+    ("idx_users_tenant_role_created", "users", "tenant_id, role, created_at DESC"),
+    ("idx_audit_tenant_action_created", "audit_logs", "tenant_id, action, created_at DESC"),
+    ("idx_tenants_created", "tenants", "created_at DESC"),
+    (
+        "idx_complaints_tenant_product_issue_created", "complaints_raw",
+        "tenant_id, product, issue, created_at DESC",
+    ),
+    ("idx_feedback_tenant_rating_created", "feedback", "tenant_id, rating, created_at DESC"),
+    (
+        "idx_feedback_complaint_tenant_created", "feedback",
+        "complaint_id, tenant_id, created_at DESC",
+    ),
+    (
+        "idx_risk_scores_tenant_category_created", "risk_scores",
+        "tenant_id, category, created_at DESC, id DESC",
+    ),
+    ("idx_solutions_tenant_created", "solutions", "tenant_id, created_at DESC, id DESC"),
+    (
+        "idx_complaints_tenant_created_issue", "complaints_raw",
+        "tenant_id, created_at DESC, id DESC, issue",
+    ),
+    (
+        "idx_feedback_tenant_created_rating", "feedback",
+        "tenant_id, created_at DESC, id DESC, rating",
+    ),
+    (
+        "idx_risk_scores_tenant_created_category", "risk_scores",
+        "tenant_id, created_at DESC, id DESC, category",
+    ),
+]
+
+# Superseded indexes: the baseline ones, and the uncovered tenant/created_at
+# ones that create_all may have built before the covering versions existed
+_SUPERSEDED = [
+    ("idx_complaints_tenant_created", "complaints_raw"),
+    ("idx_feedback_tenant_rating", "feedback"),
+    ("idx_feedback_tenant_created", "feedback"),
+    ("idx_risk_scores_tenant_created", "risk_scores"),
+]
+
+
+def _has_index(bind, table: str, index: str) -> bool:
+    return bool(bind.execute(sa.text("""
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND INDEX_NAME = :index
+    """), {"table": table, "index": index}).scalar())
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    for index, table, columns in _INDEXES:
+        if not _has_index(bind, table, index):
+            op.execute(f"CREATE INDEX {index} ON {table} ({columns})")
+    for index, table in _SUPERSEDED:
+        if _has_index(bind, table, index):
+            op.drop_index(index, table_name=table)
+
+
+def downgrade() -> None:
+    op.execute("CREATE INDEX idx_complaints_tenant_created ON complaints_raw (tenant_id, created_at)")
+    op.execute("CREATE INDEX idx_feedback_tenant_rating ON feedback (tenant_id, rating)")
+    for index, table, _ in reversed(_INDEXES):
+        op.drop_index(index, table_name=table)
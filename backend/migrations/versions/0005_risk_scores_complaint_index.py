@@ -0,0 +1,43 @@
+"""Index risk_scores by complaint for the latest-risk joins
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-15
+
+Also drops the complaints_raw (tenant, user) and (tenant, company) history
+indexes if create_all built them; the historical risk features now read the
+user_company_stats rollup, so nothing queries them and they only slowed
+ingest.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+_UNUSED = ["idx_complaints_tenant_user_created", "idx_complaints_tenant_company_created"]
+
+
+def _has_index(bind, table: str, index: str) -> bool:
+    return bool(bind.execute(sa.text("""
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND INDEX_NAME = :index
+    """), {"table": table, "index": index}).scalar())
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    if not _has_index(bind, "risk_scores", "idx_risk_scores_complaint_risk"):
+        op.create_index("idx_risk_scores_complaint_risk", "risk_scores", ["complaint_id", "risk"])
+    for index in _UNUSED:
+        if _has_index(bind, "complaints_raw", index):
+            op.drop_index(index, table_name="complaints_raw")
+
+
+def downgrade() -> None:
+    op.drop_index("idx_risk_scores_complaint_risk", table_name="risk_scores")